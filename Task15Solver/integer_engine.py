@@ -0,0 +1,449 @@
+"""
+Задача 15 с целочисленными предикатами: DEL(x, A) (x делится на A), x & A
+(поразрядная конъюнкция) и неравенства с A. Ищется целое A, при котором выражение
+истинно (или ложно) для всех целых x из x_range (и y из y_range, если задан).
+"""
+import ast
+import itertools
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from common.safe_eval import compile_expression
+from segment_engine import MAX_CELLS, SEARCH_MODES
+
+TERM_NAME = '_A_term'
+MONOTONIC_MODES = ("auto", "increasing", "decreasing", "none")
+
+
+def DEL(x, a):
+    if np.isscalar(a) and a == 0:
+        return x == 0
+    return x % a == 0
+
+
+def impl(a, b):
+    return np.logical_or(np.logical_not(a), b)
+
+
+@dataclass(frozen=True)
+class IntegerProblem:
+    """
+    :param expression: Выражение с DEL(x, n), x & n, impl(p, q), and, or, not и неизвестным A.
+    :param a_range: Диапазон перебора A (для DEL - только натуральные).
+    :param x_range: Целые x, при которых проверяется выражение (включительно).
+    :param mode: "min" / "max" - наименьшее / наибольшее A, "all" - все подходящие.
+    :param y_range: Если задан, выражение проверяется на сетке пар (x, y).
+    :param monotonic: "increasing" - если A подходит, то и любое большее A подходит,
+                      "decreasing" - наоборот; тогда A ищется двоичным поиском.
+                      "auto" - определить по выражению, "none" - не использовать.
+    """
+    expression: str
+    a_range: Tuple[int, int] = (1, 1000)
+    x_range: Tuple[int, int] = (0, 1000)
+    mode: str = "min"
+    must_be_true: bool = True
+    y_range: Optional[Tuple[int, int]] = None
+    monotonic: str = "auto"
+
+    def __post_init__(self):
+        if self.mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {self.mode}")
+        if self.monotonic not in MONOTONIC_MODES:
+            raise ValueError(f"Unknown monotonic mode: {self.monotonic}")
+        if not self.expression.strip():
+            raise ValueError("Empty expression")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IntegerProblem":
+        return cls(
+            expression=data["expression"],
+            a_range=tuple(data.get("a_range", (1, 1000))),
+            x_range=tuple(data.get("x_range", (0, 1000))),
+            mode=data.get("mode", "min"),
+            must_be_true=data.get("must_be_true", True),
+            y_range=tuple(data["y_range"]) if data.get("y_range") else None,
+            monotonic=data.get("monotonic", "auto"),
+        )
+
+
+@dataclass
+class IntegerSolution:
+    best: Optional[int] = None
+    valid: List[int] = field(default_factory=list)
+    strategy: str = "enumerate"
+    kind: Optional[str] = None
+    points_checked: int = 0
+    candidates_checked: int = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.valid)
+
+    def to_dict(self, include_valid: bool) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "best": self.best,
+            "count": self.count,
+            "strategy": self.strategy,
+            "kind": self.kind,
+            "points_checked": self.points_checked,
+            "candidates_checked": self.candidates_checked,
+        }
+        if include_valid:
+            data["valid"] = list(self.valid)
+        return data
+
+
+def _is_name(node: ast.AST, name: str) -> bool:
+    return isinstance(node, ast.Name) and node.id == name
+
+
+def _is_zero(node: ast.AST) -> bool:
+    return isinstance(node, ast.Constant) and not isinstance(node.value, bool) and node.value == 0
+
+
+def _is_and_term(node: ast.AST) -> bool:
+    """x & A или A & x."""
+    return isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd) and (
+        (_is_name(node.left, 'x') and _is_name(node.right, 'A')) or
+        (_is_name(node.left, 'A') and _is_name(node.right, 'x')))
+
+
+def _is_del_term(node: ast.AST) -> bool:
+    """DEL(x, A)."""
+    return isinstance(node, ast.Call) and _is_name(node.func, 'DEL') and len(node.args) == 2 \
+        and _is_name(node.args[0], 'x') and _is_name(node.args[1], 'A')
+
+
+def _is_mod_term(node: ast.AST) -> bool:
+    """x % A (в сравнении с 0 это тот же DEL(x, A))."""
+    return isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mod) \
+        and _is_name(node.left, 'x') and _is_name(node.right, 'A')
+
+
+class _TermRewriter(ast.NodeTransformer):
+    """
+    Заменяет вхождения A на логическую переменную TERM_NAME: DEL(x, A) и x % A == 0 -> T,
+    x & A != 0 -> T, x & A == 0 -> not T, x & A в логическом контексте -> T.
+    Если после замены A остался в выражении, вывести ограничения нельзя.
+    """
+
+    def __init__(self) -> None:
+        self.kinds = set()
+
+    def _term(self, kind: str) -> ast.Name:
+        self.kinds.add(kind)
+        return ast.Name(id=TERM_NAME, ctx=ast.Load())
+
+    def _truth(self, node: ast.AST) -> ast.AST:
+        if _is_and_term(node):
+            return self._term("and")
+        return self.visit(node)
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        if _is_del_term(node):
+            return self._term("del")
+        if _is_name(node.func, 'impl'):
+            node.args = [self._truth(arg) for arg in node.args]
+            return node
+        return self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        if len(node.ops) == 1 and isinstance(node.ops[0], (ast.Eq, ast.NotEq)):
+            left, right = node.left, node.comparators[0]
+            if _is_zero(left):
+                left, right = right, left
+            if _is_zero(right) and (_is_and_term(left) or _is_mod_term(left)):
+                # x & A == 0 - ложный предикат, x % A == 0 - истинный DEL.
+                term = self._term("and" if _is_and_term(left) else "del")
+                if isinstance(node.ops[0], ast.Eq) == _is_and_term(left):
+                    return ast.UnaryOp(op=ast.Not(), operand=term)
+                return term
+        return self.generic_visit(node)
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        node.values = [self._truth(value) for value in node.values]
+        return node
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        if isinstance(node.op, ast.Not):
+            node.operand = self._truth(node.operand)
+            return node
+        return self.generic_visit(node)
+
+    def visit_IfExp(self, node: ast.IfExp) -> ast.AST:
+        node.test = self._truth(node.test)
+        node.body = self.visit(node.body)
+        node.orelse = self.visit(node.orelse)
+        return node
+
+
+def _x_only_in_bitwise_and(tree: ast.AST) -> Optional[Tuple[int, bool]]:
+    """
+    Если x входит в выражение только как x & K (K - неотрицательная константа или A),
+    возвращает (наибольшая такая константа, встречается ли x & A); иначе None.
+    Тогда значение выражения зависит лишь от младших разрядов x.
+    """
+    operands = set()
+    largest, uses_a = 0, False
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd)):
+            continue
+        for this, other in ((node.left, node.right), (node.right, node.left)):
+            if not _is_name(this, 'x'):
+                continue
+            operands.add(id(this))
+            if _is_name(other, 'A'):
+                uses_a = True
+            elif isinstance(other, ast.Constant) and type(other.value) is int and other.value >= 0:
+                largest = max(largest, other.value)
+            else:
+                return None
+    if any(_is_name(node, 'x') and id(node) not in operands for node in ast.walk(tree)):
+        return None
+    return largest, uses_a
+
+
+_INCREASING_OPS = {ast.Gt: 1, ast.GtE: 1, ast.Lt: -1, ast.LtE: -1}
+
+
+def _a_direction(node: ast.AST, polarity: int) -> Optional[set]:
+    """
+    Направления, в которых истинность поддерева растет с ростом A (+1 / -1),
+    с учетом знака polarity (внутри not и посылки impl он меняется).
+    None - A входит не только в неравенства вида A > t, t <= A и т.п.
+    """
+    if not any(_is_name(sub, 'A') for sub in ast.walk(node)):
+        return set()
+    if isinstance(node, ast.BoolOp):
+        parts = [_a_direction(value, polarity) for value in node.values]
+    elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        parts = [_a_direction(node.operand, -polarity)]
+    elif isinstance(node, ast.Call) and _is_name(node.func, 'impl') and len(node.args) == 2:
+        parts = [_a_direction(node.args[0], -polarity), _a_direction(node.args[1], polarity)]
+    elif isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in _INCREASING_OPS:
+        sign = _INCREASING_OPS[type(node.ops[0])]
+        left, right = node.left, node.comparators[0]
+        if _is_name(left, 'A') and _a_direction(right, 1) == set():
+            return {sign * polarity}
+        if _is_name(right, 'A') and _a_direction(left, 1) == set():
+            return {-sign * polarity}
+        return None
+    else:
+        return None
+    if any(part is None for part in parts):
+        return None
+    return set().union(*parts)
+
+
+class IntegerEngine:
+    """
+    Поиск A для выражений с DEL(x, A), x & A и неравенствами с A. Ограничения на A
+    выводятся напрямую ("derive"), если A входит только в один вид предиката;
+    для выражений, монотонных по A, ищется граница луча ("bisect"); иначе A
+    перебираются ("enumerate").
+    """
+
+    def __init__(self, problem: IntegerProblem) -> None:
+        self.problem = problem
+        self.compiled = compile_expression(problem.expression)
+        a_start, a_end = problem.a_range
+        self.candidates = np.arange(a_start, a_end + 1, dtype=np.int64)
+        self.x = self._x_values()
+        self.y = None
+        self.shape = self.x.shape
+        if problem.y_range is not None:
+            y_start, y_end = problem.y_range
+            self.y = np.arange(y_start, y_end + 1, dtype=np.int64)
+            self.shape = (len(self.x), len(self.y))
+
+    def _x_values(self) -> np.ndarray:
+        x_start, x_end = self.problem.x_range
+        x = np.arange(x_start, x_end + 1, dtype=np.int64)
+        # Если x встречается только в x & K, важны лишь младшие разряды x: диапазон
+        # в 10^6 сводится к нескольким десяткам различных значений.
+        found = _x_only_in_bitwise_and(self.compiled.tree)
+        if found is None or len(x) == 0:
+            return x
+        largest, uses_a = found
+        if uses_a:
+            if self.problem.a_range[0] < 0:
+                return x
+            largest = max(largest, self.problem.a_range[1])
+        bits = max(1, int(largest).bit_length())
+        if len(x) <= (1 << bits):
+            return x
+        return np.unique(x & ((1 << bits) - 1))
+
+    def _context(self, **values) -> Dict[str, Any]:
+        # С y_range сетка двумерная: x - столбец, y - строка.
+        if self.y is None:
+            return {'x': self.x, 'DEL': DEL, 'impl': impl, **values}
+        return {'x': self.x[:, None], 'y': self.y[None, :], 'DEL': DEL, 'impl': impl, **values}
+
+    def _holds(self, result) -> np.ndarray:
+        result = np.broadcast_to(np.asarray(result).astype(bool), self.shape)
+        return result == self.problem.must_be_true
+
+    def _grid_x(self) -> np.ndarray:
+        """Значение x в каждой точке сетки."""
+        if self.y is None:
+            return self.x
+        return np.broadcast_to(self.x[:, None], self.shape)
+
+    def solve(self) -> IntegerSolution:
+        kind, rewritten = self._rewrite()
+        direction = None if kind is not None else self._direction()
+        self._evaluations = 0
+        if kind is not None:
+            valid = self._derive(kind, rewritten)
+            solution = IntegerSolution(strategy="derive", kind=kind)
+            self._evaluations = len(self.candidates)
+        elif direction is not None:
+            valid = self._bisect(direction)
+            solution = IntegerSolution(strategy="bisect")
+        else:
+            valid = self._enumerate()
+            solution = IntegerSolution(strategy="enumerate")
+
+        solution.valid = self.candidates[valid].tolist()
+        solution.points_checked = int(np.prod(self.shape))
+        solution.candidates_checked = self._evaluations
+        if solution.valid and self.problem.mode != "all":
+            solution.best = solution.valid[0] if self.problem.mode == "min" else solution.valid[-1]
+        return solution
+
+    def _rewrite(self):
+        if TERM_NAME in self.compiled.names:
+            return None, None
+        rewriter = _TermRewriter()
+        tree = rewriter.visit(ast.parse(self.compiled.source, mode='eval'))
+        if len(rewriter.kinds) != 1 or any(_is_name(node, 'A') for node in ast.walk(tree)):
+            return None, None
+        kind = rewriter.kinds.pop()
+        if kind == "del" and self.problem.a_range[0] < 1:
+            return None, None
+        return kind, compile_expression(ast.unparse(ast.fix_missing_locations(tree)))
+
+    def _derive(self, kind: str, rewritten) -> np.ndarray:
+        with np.errstate(all='ignore'):
+            with_term = self._holds(rewritten.evaluate_array(self._context(**{TERM_NAME: True})))
+            without_term = self._holds(rewritten.evaluate_array(self._context(**{TERM_NAME: False})))
+
+        valid = np.zeros(len(self.candidates), dtype=bool)
+        if not np.all(with_term | without_term):
+            return valid
+        # MUST - x, где предикат обязан быть истинным, AVOID - ложным. Для DEL A делит
+        # НОД всех MUST и не делит ни одного AVOID; для & A пересекается с каждым MUST
+        # и не имеет общих разрядов с ИЛИ всех AVOID.
+        grid_x = self._grid_x()
+        must = grid_x[with_term & ~without_term]
+        avoid = grid_x[without_term & ~with_term]
+
+        if kind == "del":
+            return self._derive_del(must, avoid)
+        return self._derive_and(must, avoid)
+
+    def _derive_del(self, must: np.ndarray, avoid: np.ndarray) -> np.ndarray:
+        must_gcd = int(np.gcd.reduce(np.abs(must))) if len(must) else 0
+        valid = must_gcd % self.candidates == 0
+
+        # AVOID отмечаются на сетке x, кратные каждого A просматриваются срезом: всего O(X log X).
+        x_start = int(self.x[0]) if len(self.x) else 0
+        is_avoid = np.zeros(len(self.x), dtype=bool)
+        is_avoid[avoid - x_start] = True
+        for i in np.flatnonzero(valid):
+            a = int(self.candidates[i])
+            first = -(-x_start // a) * a
+            if is_avoid[first - x_start::a].any():
+                valid[i] = False
+        return valid
+
+    def _derive_and(self, must: np.ndarray, avoid: np.ndarray) -> np.ndarray:
+        cands = self.candidates
+        forbidden = int(np.bitwise_or.reduce(avoid)) if len(avoid) else 0
+        valid = (cands & forbidden) == 0
+        if not len(must):
+            return valid
+
+        # Для x & A важны только разряды, которые бывают у кандидатов.
+        a_bits = np.bitwise_or.reduce(cands) if len(cands) else 0
+        must = np.unique(must & a_bits)
+        if must[0] == 0:
+            return np.zeros(len(cands), dtype=bool)
+        block = max(1, MAX_CELLS // len(must))
+        for start in range(0, len(cands), block):
+            chunk = cands[start:start + block, None]
+            valid[start:start + block] &= np.all((chunk & must[None, :]) != 0, axis=1)
+        return valid
+
+    def _direction(self) -> Optional[int]:
+        """+1 - подходящие A замкнуты вверх, -1 - вниз, None - неизвестно."""
+        monotonic = self.problem.monotonic
+        if monotonic != "auto":
+            return {"increasing": 1, "decreasing": -1, "none": None}[monotonic]
+        directions = _a_direction(self.compiled.tree.body, 1 if self.problem.must_be_true else -1)
+        if directions is None or len(directions) != 1:
+            return None
+        return directions.pop()
+
+    def _valid_at(self, a: int) -> bool:
+        self._evaluations += 1
+        context = self._context(A=a)
+        # Над массивами NumPy x % 0 и x // 0 молча дают 0, поэтому деление на ноль
+        # переводится в исключение. Над массивами вычисляются обе ветви and/or,
+        # так что в этом случае A проверяется по точкам, как обычным Python.
+        with np.errstate(divide='raise', over='ignore', invalid='ignore'):
+            try:
+                return bool(np.all(self._holds(self.compiled.evaluate_array(context))))
+            except ZeroDivisionError:
+                return False
+            except FloatingPointError:
+                pass
+        return self._valid_at_points(a)
+
+    def _valid_at_points(self, a: int) -> bool:
+        """Проверка A по одной точке; деление на ноль где-либо - A не подходит."""
+        must_be_true = self.problem.must_be_true
+        context = {'DEL': DEL, 'impl': impl, 'A': a}
+        points = itertools.product(self.x.tolist(), self.y.tolist()) if self.y is not None \
+            else ((x,) for x in self.x.tolist())
+        for point in points:
+            context.update(zip(('x', 'y'), point))
+            try:
+                if bool(self.compiled.evaluate(context)) != must_be_true:
+                    return False
+            except ZeroDivisionError:
+                return False
+        return True
+
+    def _bisect(self, direction: int) -> np.ndarray:
+        """Подходящие A - суффикс (direction=1) или префикс (-1) кандидатов; ищется его граница."""
+        n = len(self.candidates)
+        valid = np.zeros(n, dtype=bool)
+        order = range(n) if direction == 1 else range(n - 1, -1, -1)
+        if not n or not self._valid_at(int(self.candidates[order[-1]])):
+            return valid
+        lo, hi = 0, n - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._valid_at(int(self.candidates[order[mid]])):
+                hi = mid
+            else:
+                lo = mid + 1
+        if direction == 1:
+            valid[order[lo]:] = True
+        else:
+            valid[:order[lo] + 1] = True
+        return valid
+
+    def _enumerate(self) -> np.ndarray:
+        valid = np.zeros(len(self.candidates), dtype=bool)
+        for i, a in enumerate(self.candidates.tolist()):
+            valid[i] = self._valid_at(a)
+        return valid
+
+
+def solve(problem: IntegerProblem) -> IntegerSolution:
+    return IntegerEngine(problem).solve()
@@ -0,0 +1,652 @@
+import argparse
+import ast
+import dataclasses
+import itertools
+import json
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from common.safe_eval import compile_expression
+
+Segment = Tuple[float, float]
+
+SEARCH_MODES = ("min", "max", "all")
+STRATEGIES = ("auto", "vectorize", "enumerate")
+MAX_CELLS = 1 << 22
+
+
+def breakpoint_values(endpoints, x_start: float, x_end: float) -> List[float]:
+    """
+    Точки, в которых достаточно проверить выражение из предикатов вида «x в отрезке»:
+    оно постоянно между соседними концами отрезков, поэтому берутся сами концы
+    (внутри [x_start, x_end]), границы диапазона и по одной точке внутри каждого промежутка.
+    """
+    if x_start > x_end:
+        return []
+    points = sorted({p for p in endpoints if x_start <= p <= x_end} | {x_start, x_end})
+    values = []
+    for left, right in zip(points, points[1:]):
+        values.append(left)
+        values.append((left + right) / 2)
+    values.append(points[-1])
+    return values
+
+
+def step_values(x_start: float, x_end: float, step: float) -> List[float]:
+    x_values = []
+    curr_x = x_start
+    while curr_x <= x_end:
+        x_values.append(curr_x)
+        curr_x += step
+    return x_values
+
+
+def in_seg(start: float, end: float, val: float) -> bool:
+    return start <= val <= end
+
+
+def impl(a, b) -> bool:
+    return (not a) or b
+
+
+@dataclass(frozen=True)
+class SegmentProblem:
+    """
+    Задача 15 про отрезки: найти отрезок A = [a; b] с целыми концами из a_range,
+    при котором выражение истинно (must_be_true) или ложно при всех x из x_range.
+
+    :param segments: Известные отрезки {'B': (10, 15), ...}.
+    :param expression: Выражение с B(x), C(x), A(x), impl(p, q), and, or, not.
+    :param mode: "min" / "max" - отрезок минимальной / максимальной длины, "all" - все.
+    :param x_step: Шаг перебора x; None - проверка только в точках излома (точно).
+    :param strategy: "auto" - вывести ограничения на A напрямую, если выражение
+                     это позволяет, иначе векторный перебор (или обычный без NumPy),
+                     "vectorize" - всегда векторный перебор, "enumerate" - всегда обычный.
+    :param unknowns: Неизвестные отрезки с диапазонами концов {'A': (0, 100), 'D': (0, 50)};
+                     если задано, заменяет единственное A с a_range.
+    """
+    segments: Dict[str, Segment]
+    expression: str
+    a_range: Tuple[int, int]
+    x_range: Tuple[float, float] = (0, 100)
+    mode: str = "min"
+    must_be_true: bool = True
+    x_step: Optional[float] = None
+    strategy: str = "auto"
+    unknowns: Optional[Dict[str, Tuple[int, int]]] = None
+
+    def __post_init__(self):
+        if self.mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {self.mode}")
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {self.strategy}")
+        if not self.segments and self.unknowns is None:
+            raise ValueError("No known segments given")
+        if not self.expression.strip():
+            raise ValueError("Empty expression")
+        if self.x_step is not None and self.x_step <= 0:
+            raise ValueError("x_step must be positive")
+        if self.unknowns is not None:
+            if not self.unknowns:
+                raise ValueError("No unknown segments given")
+            clashes = set(self.unknowns) & set(self.segments)
+            if clashes:
+                raise ValueError(f"Segments are both known and unknown: {sorted(clashes)}")
+
+    @property
+    def unknown_ranges(self) -> Dict[str, Tuple[int, int]]:
+        return self.unknowns if self.unknowns else {'A': self.a_range}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SegmentProblem":
+        unknowns = {name: tuple(r) for name, r in data["unknowns"].items()} if data.get("unknowns") else None
+        return cls(
+            segments={name: (float(s), float(e)) for name, (s, e) in data.get("segments", {}).items()},
+            expression=data["expression"],
+            a_range=tuple(data["a_range"]) if "a_range" in data else next(iter(unknowns.values())),
+            x_range=tuple(data.get("x_range", (0, 100))),
+            mode=data.get("mode", "min"),
+            must_be_true=data.get("must_be_true", True),
+            x_step=data.get("x_step"),
+            strategy=data.get("strategy", "auto"),
+            unknowns=unknowns,
+        )
+
+
+@dataclass(frozen=True)
+class ARegion:
+    """Множество отрезков A = [a; b]: a_min <= a <= a_max, max(a, b_min) <= b <= b_max."""
+    a_min: int
+    a_max: int
+    b_min: int
+    b_max: int
+
+    def count(self) -> int:
+        a_max = min(self.a_max, self.b_max)
+        if self.a_min > a_max or self.b_min > self.b_max:
+            return 0
+        # a < b_min: b пробегает весь [b_min; b_max]; a >= b_min: b от a до b_max.
+        low_part = max(0, min(a_max, self.b_min - 1) - self.a_min + 1)
+        total = low_part * (self.b_max - self.b_min + 1)
+        first = max(self.a_min, self.b_min)
+        if first <= a_max:
+            total += sum_range(self.b_max - a_max + 1, self.b_max - first + 1)
+        return total
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for a in range(self.a_min, min(self.a_max, self.b_max) + 1):
+            for b in range(max(a, self.b_min), self.b_max + 1):
+                yield a, b
+
+    def shortest(self) -> Optional[Tuple[int, int]]:
+        """Кратчайший отрезок области (при равенстве - с меньшим a)."""
+        if not self.count():
+            return None
+        if min(self.a_max, self.b_max) >= self.b_min:
+            a = max(self.a_min, self.b_min)
+            return a, a
+        return self.a_max, self.b_min
+
+    def longest(self) -> Optional[Tuple[int, int]]:
+        """Самый длинный отрезок области (при равенстве - с меньшим a)."""
+        if not self.count():
+            return None
+        return self.a_min, self.b_max
+
+
+def sum_range(lo: int, hi: int) -> int:
+    """lo + (lo + 1) + ... + hi."""
+    return (lo + hi) * (hi - lo + 1) // 2
+
+
+@dataclass
+class SegmentSolution:
+    """
+    При нескольких неизвестных best и элементы iter_valid() - кортежи отрезков
+    в порядке unknowns, best_length - их суммарная длина, а найденное хранится
+    в groups: (отрезки всех неизвестных, кроме последнего; решение для последнего).
+    fallback_reason - почему векторный перебор не удался и решение получено обычным.
+    """
+    best: Optional[Tuple] = None
+    best_length: Optional[int] = None
+    valid: List[Tuple[int, int]] = field(default_factory=list)
+    regions: List[ARegion] = field(default_factory=list)
+    strategy: str = "enumerate"
+    max_points_checked: int = 0
+    candidates_checked: int = 0
+    cancelled: bool = False
+    unknowns: Tuple[str, ...] = ('A',)
+    groups: List[Tuple[Tuple[Segment, ...], "SegmentSolution"]] = field(default_factory=list)
+    fallback_reason: Optional[str] = None
+
+    @property
+    def count(self) -> int:
+        return len(self.valid) + sum(region.count() for region in self.regions) + \
+            sum(sub.count for _, sub in self.groups)
+
+    def iter_valid(self) -> Iterator[Tuple]:
+        """Все подходящие отрезки A (при выводе ограничений - лениво, по областям)."""
+        yield from self.valid
+        for region in self.regions:
+            yield from region
+        for fixed, sub in self.groups:
+            for seg in sub.iter_valid():
+                yield fixed + (seg,)
+
+    def to_dict(self, include_valid: bool, max_listed: int = 1000) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "best": list(self.best) if self.best else None,
+            "best_length": self.best_length,
+            "count": self.count,
+            "strategy": self.strategy,
+            "candidates_checked": self.candidates_checked,
+        }
+        if self.cancelled:
+            data["cancelled"] = True
+        if self.fallback_reason:
+            data["fallback_reason"] = self.fallback_reason
+        if len(self.unknowns) > 1:
+            data["unknowns"] = list(self.unknowns)
+        if self.strategy == "derive":
+            data["regions"] = [[r.a_min, r.a_max, r.b_min, r.b_max] for r in self.regions]
+        if include_valid:
+            data["valid"] = [list(seg) for seg in itertools.islice(self.iter_valid(), max_listed)]
+            data["valid_truncated"] = self.count > max_listed
+        return data
+
+
+ProgressCallback = Callable[[int, int, SegmentSolution], None]
+
+
+class SegmentEngine:
+    """
+    Перебор отрезков A без GUI: используется окном SegmentSolver и CLI.
+
+    :param progress: Вызывается по ходу перебора как progress(проверено, всего, решение);
+                     решение - частичное, его не следует менять.
+    :param cancel_event: Если установлен, перебор останавливается и solve() возвращает
+                         найденное к этому моменту с cancelled=True.
+    """
+
+    def __init__(self, problem: SegmentProblem, progress: Optional[ProgressCallback] = None,
+                 cancel_event: Optional[threading.Event] = None) -> None:
+        self.problem = problem
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self.compiled = compile_expression(problem.expression)
+        self.context: Dict[str, Any] = {'impl': impl}
+        for name, (s, e) in problem.segments.items():
+            self.context[name] = lambda x, s=s, e=e: in_seg(s, e, x)
+        self.known_endpoints = [p for seg in problem.segments.values() for p in seg]
+        ranges = problem.unknown_ranges
+        self.unknown, self.a_range = next(iter(ranges.items())) if len(ranges) == 1 else (None, None)
+
+    def x_values_for(self, a: int, b: int) -> List[float]:
+        x_start, x_end = self.problem.x_range
+        if self.problem.x_step is None:
+            return breakpoint_values(self.known_endpoints + [a, b], x_start, x_end)
+        return step_values(x_start, x_end, self.problem.x_step)
+
+    def _report(self, done: int, total: int, solution: SegmentSolution) -> bool:
+        """Сообщает о ходе перебора; True - перебор отменен."""
+        if self.progress is not None:
+            self.progress(done, total, solution)
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def is_valid(self, a: int, b: int, x_values: Sequence[float]) -> bool:
+        context = self.context
+        context[self.unknown] = lambda x: in_seg(a, b, x)
+        must_be_true = self.problem.must_be_true
+        for val_x in x_values:
+            context['x'] = val_x
+            try:
+                res = self.compiled.evaluate(context)
+            except Exception:
+                return False
+            if bool(res) != must_be_true:
+                return False
+        return True
+
+    def is_analyzable(self) -> bool:
+        """
+        Выражение зависит от x только через предикаты вида S(x) для известных
+        отрезков и A, а вызываются только они и impl. Тогда на каждом элементарном
+        промежутке между концами отрезков все, кроме A(x), постоянно.
+        """
+        predicates = set(self.problem.segments) | {self.unknown}
+        tree = self.compiled.tree
+        predicate_args = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                if not isinstance(node.func, ast.Name):
+                    return False
+                if node.func.id in predicates:
+                    if len(node.args) != 1 or not isinstance(node.args[0], ast.Name) \
+                            or node.args[0].id != 'x':
+                        return False
+                    predicate_args.add(id(node.args[0]))
+                elif node.func.id != 'impl':
+                    return False
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and node.id == 'x' and id(node) not in predicate_args:
+                return False
+            if isinstance(node, ast.Name) and node.id not in predicates | {'x', 'impl'}:
+                return False
+        return True
+
+    def _satisfied_with(self, a_value: bool, x: float) -> bool:
+        context = self.context
+        context[self.unknown] = lambda _: a_value
+        context['x'] = x
+        try:
+            return bool(self.compiled.evaluate(context)) == self.problem.must_be_true
+        except Exception:
+            return False
+
+    def _elementary_pieces(self) -> List[Tuple[float, float]]:
+        """
+        Элементарные куски диапазона x по порядку: (p, p) - точка-конец отрезка,
+        (p, q) при p < q - открытый промежуток между соседними концами.
+        """
+        x_start, x_end = self.problem.x_range
+        if x_start > x_end:
+            return []
+        points = sorted({p for p in self.known_endpoints if x_start <= p <= x_end} | {x_start, x_end})
+        pieces = []
+        for left, right in zip(points, points[1:]):
+            pieces.append((left, left))
+            pieces.append((left, right))
+        pieces.append((points[-1], points[-1]))
+        return pieces
+
+    def derive_regions(self) -> Optional[List[ARegion]]:
+        """
+        Для каждого элементарного куска выясняет, должен ли A его содержать,
+        не пересекаться с ним или это неважно, и по этим ограничениям строит
+        все подходящие A в виде областей ARegion. None - выражение не анализируется.
+        """
+        if not self.is_analyzable():
+            return None
+
+        must, avoid = [], []
+        for left, right in self._elementary_pieces():
+            x = (left + right) / 2
+            with_a, without_a = self._satisfied_with(True, x), self._satisfied_with(False, x)
+            if with_a and not without_a:
+                must.append((left, right))
+            elif without_a and not with_a:
+                avoid.append((left, right))
+            elif not with_a and not without_a:
+                return []
+
+        a_start, a_end = self.a_range
+        if must:
+            return self._regions_containing(must, avoid, a_start, a_end)
+        return self._regions_avoiding(avoid, a_start, a_end)
+
+    @staticmethod
+    def _regions_containing(must, avoid, a_start: int, a_end: int) -> List[ARegion]:
+        # A замкнут, поэтому содержит кусок целиком тогда и только тогда, когда содержит его замыкание.
+        hull_left = min(left for left, _ in must)
+        hull_right = max(right for _, right in must)
+        a_min, a_max = a_start, min(a_end, math.floor(hull_left))
+        b_min, b_max = max(a_start, math.ceil(hull_right)), a_end
+
+        for left, right in avoid:
+            if left == right:
+                if hull_left <= left <= hull_right:
+                    return []
+                if left < hull_left:
+                    a_min = max(a_min, math.floor(left) + 1)
+                else:
+                    b_max = min(b_max, math.ceil(left) - 1)
+            else:
+                if left < hull_right and right > hull_left:
+                    return []
+                if right <= hull_left:
+                    a_min = max(a_min, math.ceil(right))
+                else:
+                    b_max = min(b_max, math.floor(left))
+
+        region = ARegion(a_min, a_max, b_min, b_max)
+        return [region] if region.count() else []
+
+    @staticmethod
+    def _regions_avoiding(avoid, a_start: int, a_end: int) -> List[ARegion]:
+        # Куски идут по порядку, так что компоненты дополнения к запрещенным получаются за один проход.
+        regions = []
+        lower = a_start
+        for left, right in avoid:
+            if left == right:
+                upper, next_lower = math.ceil(left) - 1, math.floor(left) + 1
+            else:
+                upper, next_lower = math.floor(left), math.ceil(right)
+            upper = min(upper, a_end)
+            if lower <= upper:
+                regions.append(ARegion(lower, upper, lower, upper))
+            lower = max(lower, next_lower)
+        if lower <= a_end:
+            regions.append(ARegion(lower, a_end, lower, a_end))
+        return regions
+
+    def solve(self) -> SegmentSolution:
+        if self.unknown is None:
+            return self._solve_multi()
+        strategy = self.problem.strategy
+        if strategy == "auto" and self.problem.x_step is None:
+            regions = self.derive_regions()
+            if regions is not None:
+                return self._solution_from_regions(regions)
+        fallback_reason = None
+        if strategy != "enumerate":
+            try:
+                return self._enumerate_arrays()
+            except ImportError as e:
+                if strategy == "vectorize":
+                    raise
+                fallback_reason = f"NumPy недоступен: {e}"
+            except (TypeError, ValueError, ArithmeticError) as e:
+                # Выражение не вычисляется над массивами (например, int(x) или ветвление
+                # по x): обычный перебор разберет кандидатов по одному.
+                fallback_reason = f"{type(e).__name__}: {e}"
+        solution = self._enumerate()
+        solution.fallback_reason = fallback_reason
+        return solution
+
+    def _solve_multi(self) -> SegmentSolution:
+        """
+        Несколько неизвестных: перебираются отрезки всех, кроме последнего, и при
+        каждом наборе они становятся известными, а последний ищется обычным solve() -
+        для выражений из предикатов отрезков это вывод ограничений по точкам излома,
+        т.е. без перебора. Так две неизвестных с диапазонами по 100 - это ~5000
+        выводов, а не ~2.5*10^7 пар отрезков.
+        """
+        problem = self.problem
+        ranges = problem.unknown_ranges
+        *outer, last = ranges
+        solution = SegmentSolution(strategy="multi", unknowns=tuple(ranges))
+
+        choices = []
+        for name in outer:
+            lo, hi = ranges[name]
+            choices.append([(a, b) for a in range(lo, hi + 1) for b in range(a, hi + 1)])
+        total = math.prod(len(c) for c in choices)
+
+        for done, fixed in enumerate(itertools.product(*choices)):
+            if done and self._report(done, total, solution):
+                solution.cancelled = True
+                break
+            sub_problem = dataclasses.replace(
+                problem, segments={**problem.segments, **dict(zip(outer, fixed))},
+                a_range=ranges[last], unknowns={last: ranges[last]})
+            # Отмена доходит и до вложенного перебора; его прогресс не показывается,
+            # чтобы не путать с общим счетчиком наборов.
+            sub = SegmentEngine(sub_problem, cancel_event=self.cancel_event).solve()
+            solution.candidates_checked += sub.candidates_checked + 1
+            solution.max_points_checked = max(solution.max_points_checked, sub.max_points_checked)
+            if sub.count:
+                solution.groups.append((fixed, sub))
+                if problem.mode != "all" and sub.best is not None:
+                    length = sum(b - a for a, b in fixed) + sub.best_length
+                    if solution.best is None or (problem.mode == "min" and length < solution.best_length) or \
+                            (problem.mode == "max" and length > solution.best_length):
+                        solution.best = fixed + (sub.best,)
+                        solution.best_length = length
+            if sub.cancelled:
+                solution.cancelled = True
+                break
+        else:
+            self._report(total, total, solution)
+        return solution
+
+    def _solution_from_regions(self, regions: List[ARegion]) -> SegmentSolution:
+        solution = SegmentSolution(regions=regions, strategy="derive",
+                                   max_points_checked=len(self._elementary_pieces()))
+        mode = self.problem.mode
+        for region in regions:
+            candidate = region.shortest() if mode == "min" else region.longest()
+            if mode == "all" or candidate is None:
+                continue
+            length = candidate[1] - candidate[0]
+            if solution.best is None or (mode == "min" and length < solution.best_length) or \
+                    (mode == "max" and length > solution.best_length):
+                solution.best = candidate
+                solution.best_length = length
+        self._report(1, 1, solution)
+        return solution
+
+    def _array_context(self, x) -> Dict[str, Any]:
+        import numpy as np
+
+        context: Dict[str, Any] = {'x': x, 'impl': lambda p, q: np.logical_or(np.logical_not(p), q)}
+        for name, (s, e) in self.problem.segments.items():
+            context[name] = lambda v, s=s, e=e: (s <= v) & (v <= e)
+        return context
+
+    def _enumerate_arrays(self, max_cells: int = MAX_CELLS) -> SegmentSolution:
+        """
+        Тот же перебор, что _enumerate, и с тем же ответом, но над массивами NumPy.
+        Если выражение не вычисляется над массивами, исключение уходит в solve(),
+        и тот переходит к обычному перебору.
+        """
+        import numpy as np
+
+        problem = self.problem
+        solution = SegmentSolution(strategy="vectorize")
+        a_start, a_end = self.a_range
+        if a_start > a_end:
+            return solution
+
+        x_start, x_end = problem.x_range
+        # С шагом x_step сетка общая для всех кандидатов. В режиме точек излома у каждого
+        # кандидата своя, как в x_values_for: концы известных отрезков плюс a и b
+        # (прижатые к x_range - вне его они совпадают с границей) и середины промежутков.
+        per_candidate = problem.x_step is None and x_start <= x_end
+        if per_candidate:
+            base = np.array(sorted({p for p in self.known_endpoints if x_start <= p <= x_end} | {x_start, x_end}),
+                            dtype=float)
+            points = 2 * (len(base) + 2) - 1
+        else:
+            x = np.array(step_values(x_start, x_end, problem.x_step) if problem.x_step is not None else [],
+                         dtype=float)
+            points = len(x)
+        context = self._array_context(None)
+
+        # Кандидаты блока лежат по осям 0 (a) и 1 (b), точки x - по оси 2; блоки
+        # ограничены max_cells ячейками, чтобы память не зависела от размера a_range.
+        values = np.arange(a_start, a_end + 1)
+        n = len(values)
+        b_block = min(n, max(1, max_cells // max(1, points)))
+        a_block = max(1, max_cells // (b_block * max(1, points)))
+        solution.max_points_checked = points
+        total = n * (n + 1) // 2
+
+        with np.errstate(all='ignore'):
+            for i in range(0, n, a_block):
+                a_col = values[i:i + a_block, None, None]
+                chunk = []
+                # b >= a, поэтому блоки b начинаются с первого a блока.
+                for j in range(i, n, b_block):
+                    b_row = values[None, j:j + b_block, None]
+                    shape = (a_col.shape[0], b_row.shape[1], points)
+                    if per_candidate:
+                        grid = np.concatenate([np.broadcast_to(base, shape[:2] + base.shape),
+                                               np.broadcast_to(np.clip(a_col, x_start, x_end), shape[:2] + (1,)),
+                                               np.broadcast_to(np.clip(b_row, x_start, x_end), shape[:2] + (1,))],
+                                              axis=-1)
+                        grid.sort(axis=-1)
+                        context['x'] = np.concatenate([grid, (grid[..., :-1] + grid[..., 1:]) / 2], axis=-1)
+                    else:
+                        context['x'] = x
+                    context[self.unknown] = lambda v, a=a_col, b=b_row: (a <= v) & (v <= b)
+                    res = np.asarray(self.compiled.evaluate_array(context)).astype(bool)
+                    ok = np.broadcast_to(res == problem.must_be_true, shape).all(axis=-1)
+                    ok &= a_col[:, :, 0] <= b_row[:, :, 0]
+                    rows, cols = np.nonzero(ok)
+                    chunk.extend(zip(values[i + rows].tolist(), values[j + cols].tolist()))
+
+                # Блоки по a идут по возрастанию, так что после сортировки блока
+                # valid остается упорядоченным и лучший отрезок можно обновлять сразу.
+                chunk.sort()
+                solution.valid.extend(chunk)
+                if problem.mode != "all":
+                    for a, b in chunk:
+                        length = b - a
+                        if solution.best is None or (problem.mode == "min" and length < solution.best_length) or \
+                                (problem.mode == "max" and length > solution.best_length):
+                            solution.best = (a, b)
+                            solution.best_length = length
+
+                rows_left = max(0, n - i - a_block)
+                solution.candidates_checked = total - rows_left * (rows_left + 1) // 2
+                if self._report(solution.candidates_checked, total, solution) and rows_left:
+                    solution.cancelled = True
+                    break
+        return solution
+
+    def _enumerate(self) -> SegmentSolution:
+        problem = self.problem
+        solution = SegmentSolution()
+        a_start, a_end = self.a_range
+        fixed_x = None if problem.x_step is None else self.x_values_for(0, 0)
+
+        best_len = float('inf') if problem.mode == "min" else float('-inf')
+        n = max(0, a_end - a_start + 1)
+        total = n * (n + 1) // 2
+
+        for a in range(a_start, a_end + 1):
+            if a > a_start and self._report(solution.candidates_checked, total, solution):
+                solution.cancelled = True
+                break
+            for b in range(a, a_end + 1):
+                x_values = fixed_x if fixed_x is not None else self.x_values_for(a, b)
+                solution.max_points_checked = max(solution.max_points_checked, len(x_values))
+                solution.candidates_checked += 1
+
+                if not self.is_valid(a, b, x_values):
+                    continue
+
+                length = b - a
+                solution.valid.append((a, b))
+                if (problem.mode == "min" and length < best_len) or \
+                        (problem.mode == "max" and length > best_len):
+                    best_len = length
+                    solution.best = (a, b)
+                    solution.best_length = length
+        else:
+            self._report(solution.candidates_checked, total, solution)
+
+        return solution
+
+
+def solve(problem: SegmentProblem) -> SegmentSolution:
+    return SegmentEngine(problem).solve()
+
+
+def solve_file(path: str) -> List[Dict[str, Any]]:
+    """
+    Решает все задачи из JSON-файла (список задач или {"problems": [...]}).
+    Задачи с ключом "segments" или "unknowns" - про отрезки, остальные - с DEL(x, A) или x & A.
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    problems = data["problems"] if isinstance(data, dict) else data
+
+    results = []
+    for index, raw in enumerate(problems):
+        record: Dict[str, Any] = {"file": path, "index": index, "name": raw.get("name")}
+        try:
+            if "segments" in raw or "unknowns" in raw:
+                problem = SegmentProblem.from_dict(raw)
+                solution = solve(problem)
+            else:
+                # Задачи без отрезков - с целочисленными предикатами DEL(x, A) и x & A.
+                from integer_engine import IntegerProblem, solve as solve_integer
+                problem = IntegerProblem.from_dict(raw)
+                solution = solve_integer(problem)
+            record.update(solution.to_dict(include_valid=problem.mode == "all"))
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        results.append(record)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Пакетное решение задания 15 (отрезки)")
+    parser.add_argument('files', nargs='+', help="JSON-файлы с задачами")
+    parser.add_argument('--output', help="куда записать результаты (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    results = [record for path in args.files for record in solve_file(path)]
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,54 @@
+import dataclasses
+import itertools
 import sys
+import threading
+import time
 from typing import Dict, Tuple, List, Callable
+from PySide6.QtCore import QThread, Signal
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                                QHBoxLayout, QLabel, QLineEdit, QPushButton,
                                QTextEdit, QSpinBox, QComboBox, QTableWidget,
-                               QTableWidgetItem, QDoubleSpinBox, QMessageBox)
+                               QTableWidgetItem, QDoubleSpinBox, QMessageBox,
+                               QProgressBar)
+
+from segment_engine import SegmentProblem, SegmentEngine, SegmentSolution
+
+PARTIAL_INTERVAL = 0.3
+
+
+class SolveWorker(QThread):
+    """
+    Решает задачу в отдельном потоке. progress(проверено, всего) и partial(решение)
+    приходят в поток окна через очередь сигналов Qt; partial - не чаще PARTIAL_INTERVAL секунд.
+    """
+    progress = Signal(int, int)
+    partial = Signal(object)
+    solved = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, problem: SegmentProblem, parent=None):
+        super().__init__(parent)
+        self.problem = problem
+        self.cancel_event = threading.Event()
+        self._last_partial = 0.0
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _on_progress(self, done: int, total: int, solution: SegmentSolution):
+        self.progress.emit(done, total)
+        now = time.monotonic()
+        if now - self._last_partial >= PARTIAL_INTERVAL:
+            self._last_partial = now
+            # Копия: движок продолжает дописывать valid в этом потоке.
+            self.partial.emit(dataclasses.replace(solution, valid=list(solution.valid)))
+
+    def run(self):
+        try:
+            engine = SegmentEngine(self.problem, self._on_progress, self.cancel_event)
+            self.solved.emit(engine.solve())
+        except Exception as e:
+            self.failed.emit(str(e))
 
 
 class SegmentSolver(QMainWindow):
@@ -11,6 +56,8 @@ class SegmentSolver(QMainWindow):
         super().__init__()
         self.setWindowTitle("Задача 15 ЕГЭ - Отрезки (Refactored)")
         self.resize(700, 600)
+        self._worker = None
+        self._problem = None
         self._init_ui()
 
     def _init_ui(self):
@@ -44,6 +91,13 @@ class SegmentSolver(QMainWindow):
         self.step_spin.setValue(0.5)
         params_layout.addWidget(self.step_spin)
 
+        self.x_mode = QComboBox()
+        self.x_mode.addItems(["x по концам отрезков (точно)", "x с шагом"])
+        self.x_mode.currentIndexChanged.connect(
+            lambda index: self.step_spin.setEnabled(index == 1))
+        self.step_spin.setEnabled(False)
+        params_layout.addWidget(self.x_mode)
+
         main_layout.addLayout(params_layout)
 
         search_layout = QHBoxLayout()
@@ -61,9 +115,21 @@ class SegmentSolver(QMainWindow):
         search_layout.addStretch()
         main_layout.addLayout(search_layout)
 
+        buttons_layout = QHBoxLayout()
         self.solve_btn = QPushButton("РЕШИТЬ")
         self.solve_btn.clicked.connect(self.solve)
-        main_layout.addWidget(self.solve_btn)
+        buttons_layout.addWidget(self.solve_btn)
+
+        self.cancel_btn = QPushButton("Остановить")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel)
+        buttons_layout.addWidget(self.cancel_btn)
+        main_layout.addLayout(buttons_layout)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        main_layout.addWidget(self.progress_bar)
 
         self.result_area = QTextEdit()
         self.result_area.setReadOnly(True)
@@ -100,107 +166,133 @@ class SegmentSolver(QMainWindow):
                         continue
         return segments
 
+    def _build_problem(self) -> SegmentProblem:
+        return SegmentProblem(
+            segments=self._get_segments_from_ui(),
+            expression=self.expr_input.text().strip(),
+            a_range=(self.a_min.value(), self.a_max.value()),
+            x_range=(self.x_min.value(), self.x_max.value()),
+            mode=("min", "max", "all")[self.search_mode.currentIndex()],
+            must_be_true=(self.condition_mode.currentIndex() == 0),
+            x_step=None if self.x_mode.currentIndex() == 0 else self.step_spin.value(),
+        )
+
     def solve(self):
         try:
-            segments = self._get_segments_from_ui()
-            if not segments:
+            if not self._get_segments_from_ui():
                 QMessageBox.warning(self, "Ошибка", "Не заданы отрезки (B, C и т.д.)")
                 return
 
-            expression = self.expr_input.text().strip()
-            if not expression:
+            if not self.expr_input.text().strip():
                 QMessageBox.warning(self, "Ошибка", "Введите логическое выражение")
                 return
 
-            a_start, a_end = self.a_min.value(), self.a_max.value()
-            x_start, x_end = self.x_min.value(), self.x_max.value()
-            step = self.step_spin.value()
-
-            search_type = self.search_mode.currentIndex()
-            must_be_true = (self.condition_mode.currentIndex() == 0)
-
-            def in_seg(start, end, val):
-                return start <= val <= end
-
-            def impl(a, b):
-                return (not a) or b
-
-            eval_context = {'impl': impl, '__builtins__': {}}
-
-            for name, (s, e) in segments.items():
-                eval_context[name] = lambda x, s=s, e=e: in_seg(s, e, x)
-
-            x_values = []
-            curr_x = x_start
-            while curr_x <= x_end:
-                x_values.append(curr_x)
-                curr_x += step
-
-            total_checks = len(x_values)
-            valid_segments = []
-
-            best_len = float('inf') if search_type == 0 else float('-inf')
-            best_segment = None
-
-            for a in range(a_start, a_end + 1):
-                for b in range(a, a_end + 1):
-
-                    eval_context['A'] = lambda x, a=a, b=b: in_seg(a, b, x)
-
-                    is_valid_for_all_x = True
-                    for val_x in x_values:
-                        eval_context['x'] = val_x
-                        try:
-                            res = eval(expression, eval_context)
-
-                            if must_be_true and not res:
-                                is_valid_for_all_x = False
-                                break
-                            if not must_be_true and res:
-                                is_valid_for_all_x = False
-                                break
-                        except Exception:
-                            is_valid_for_all_x = False
-                            break
-
-                    if is_valid_for_all_x:
-                        length = b - a
-                        valid_segments.append((a, b, length))
-
-                        if search_type == 0:
-                            if length < best_len:
-                                best_len = length
-                                best_segment = (a, b)
-                        elif search_type == 1:
-                            if length > best_len:
-                                best_len = length
-                                best_segment = (a, b)
-
-            output = []
-            output.append(f"Исходные отрезки: {segments}")
-            output.append(f"Выражение: {expression}")
-            output.append(f"Проверено точек X: {total_checks} (шаг {step})\n")
-
-            if valid_segments:
-                if search_type == 2:
-                    output.append(f"Найдено {len(valid_segments)} подходящих отрезков A:")
-                    for a, b, l in sorted(valid_segments)[:20]:
-                        output.append(f"  A=[{a}; {b}], длина {l}")
-                    if len(valid_segments) > 20:
-                        output.append("  ... и другие ...")
-                else:
-                    if best_segment:
-                        type_str = "Минимальная" if search_type == 0 else "Максимальная"
-                        output.append(f"{type_str} длина: {best_len}")
-                        output.append(f"Отрезок A: [{best_segment[0]}; {best_segment[1]}]")
-            else:
-                output.append("Подходящих отрезков A не найдено в заданном диапазоне.")
-
-            self.result_area.setText("\n".join(output))
+            self._start(self._build_problem())
 
         except Exception as e:
             self.result_area.setText(f"Критическая ошибка: {e}")
 
+    def _start(self, problem: SegmentProblem):
+        if self._worker is not None:
+            self._worker.cancel()
+        self._problem = problem
+        worker = SolveWorker(problem, self)
+        worker.progress.connect(self._on_progress)
+        worker.partial.connect(self._on_partial)
+        worker.solved.connect(self._on_solved)
+        worker.failed.connect(self._on_failed)
+        worker.finished.connect(worker.deleteLater)
+        self._worker = worker
+
+        self.solve_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.progress_bar.setRange(0, 0)
+        self.result_area.setText("Идет поиск...")
+        worker.start()
+
+    def cancel(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self.cancel_btn.setEnabled(False)
+
+    def _is_current(self) -> bool:
+        return self.sender() is self._worker
+
+    def _on_progress(self, done: int, total: int):
+        if not self._is_current():
+            return
+        # QProgressBar принимает int32, поэтому большие счетчики масштабируются.
+        scale = max(1, total // 1_000_000)
+        self.progress_bar.setRange(0, max(1, total // scale))
+        self.progress_bar.setValue(done // scale)
+        self.progress_bar.setFormat(f"{done} / {total}")
+
+    def _on_partial(self, solution: SegmentSolution):
+        if self._is_current():
+            self.result_area.setText("Промежуточный результат (поиск продолжается)\n\n" +
+                                     self._format_solution(self._problem, solution))
+
+    def _on_solved(self, solution: SegmentSolution):
+        if not self._is_current():
+            return
+        text = self._format_solution(self._problem, solution)
+        if solution.cancelled:
+            text = "Поиск остановлен, показано найденное до остановки\n\n" + text
+        self.result_area.setText(text)
+        self._finish()
+
+    def _on_failed(self, message: str):
+        if self._is_current():
+            self.result_area.setText(f"Критическая ошибка: {message}")
+            self._finish()
+
+    def _finish(self):
+        self._worker = None
+        self.solve_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        if self.progress_bar.maximum() == 0:
+            self.progress_bar.setRange(0, 1)
+            self.progress_bar.setValue(1)
+
+    def closeEvent(self, event):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker.wait()
+        super().closeEvent(event)
+
+    def _format_solution(self, problem: SegmentProblem, solution: SegmentSolution) -> str:
+        output = []
+        output.append(f"Исходные отрезки: {problem.segments}")
+        output.append(f"Выражение: {problem.expression}")
+        if solution.strategy == "derive":
+            output.append(f"Ограничения на A выведены по {solution.max_points_checked} "
+                          f"участкам X (концы отрезков и промежутки между ними)\n")
+        elif problem.x_step is None:
+            output.append(f"Проверено точек X: до {solution.max_points_checked} на отрезок A "
+                          f"(концы отрезков и промежутки между ними)\n")
+        else:
+            output.append(f"Проверено точек X: {solution.max_points_checked} (шаг {problem.x_step})\n")
+        if solution.fallback_reason:
+            output.append(f"Векторный перебор не подошел ({solution.fallback_reason}), "
+                          f"отрезки проверены по одному\n")
+
+        count = solution.count
+        if count:
+            if problem.mode == "all":
+                output.append(f"Найдено {count} подходящих отрезков A:")
+                for a, b in itertools.islice(solution.iter_valid(), 20):
+                    output.append(f"  A=[{a}; {b}], длина {b - a}")
+                if count > 20:
+                    output.append("  ... и другие ...")
+            elif solution.best:
+                type_str = "Минимальная" if problem.mode == "min" else "Максимальная"
+                output.append(f"{type_str} длина: {solution.best_length}")
+                output.append(f"Отрезок A: [{solution.best[0]}; {solution.best[1]}]")
+        else:
+            output.append("Подходящих отрезков A не найдено в заданном диапазоне.")
+
+        return "\n".join(output)
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -1,8 +1,18 @@
 from __future__ import annotations
+from collections import OrderedDict
+from collections.abc import Mapping
 from dataclasses import dataclass, field
-from typing import Callable, List, Dict, Set, Optional, Union
+from typing import Any, Callable, Iterator, List, Dict, Optional, Tuple, Union
 from abc import ABC, abstractmethod
+import ast
+import itertools
 import math
+import re
+import threading
+
+import numpy as np
+
+from common.safe_eval import CompiledExpression, UnsafeExpression, compile_expression
 
 
 
@@ -10,9 +20,18 @@ class Move(ABC):
     name: str
 
     @abstractmethod
-    def apply(self, s: int) -> int:
+    def apply(self, s: int) -> Optional[int]:
+        """Состояние после хода; None - ход из s недоступен."""
         pass
 
+    def apply_array(self, s: np.ndarray) -> np.ndarray:
+        """Ход для массива состояний; базовая версия применяет apply поэлементно."""
+        return np.fromiter((self.apply(int(v)) for v in s), dtype=np.int64, count=len(s))
+
+    def available_array(self, s: np.ndarray) -> Optional[np.ndarray]:
+        """Маска состояний, из которых ход доступен; None - из всех."""
+        return None
+
 
 @dataclass(frozen=True)
 class AddMove(Move):
@@ -25,6 +44,9 @@ class AddMove(Move):
     def apply(self, s: int) -> int:
         return s + self.k
 
+    def apply_array(self, s: np.ndarray) -> np.ndarray:
+        return s + self.k
+
 
 @dataclass(frozen=True)
 class SubtractMove(Move):
@@ -37,6 +59,9 @@ class SubtractMove(Move):
     def apply(self, s: int) -> int:
         return s - self.k
 
+    def apply_array(self, s: np.ndarray) -> np.ndarray:
+        return s - self.k
+
 
 @dataclass(frozen=True)
 class MultiplyMove(Move):
@@ -49,6 +74,9 @@ class MultiplyMove(Move):
     def apply(self, s: int) -> int:
         return s * self.factor
 
+    def apply_array(self, s: np.ndarray) -> np.ndarray:
+        return s * self.factor
+
 
 @dataclass(frozen=True)
 class DivideMove(Move):
@@ -70,6 +98,18 @@ class DivideMove(Move):
         else:
             raise ValueError(f"Unknown divide mode: {self.mode}")
 
+    def apply_array(self, s: np.ndarray) -> np.ndarray:
+        d = self.divisor
+        if self.mode == "floor":
+            return s // d
+        elif self.mode == "ceil":
+            return -(-s // d)
+        elif self.mode == "round":
+            # np.rint, как и round, округляет половины к четному.
+            return np.rint(s / d).astype(np.int64)
+        else:
+            raise ValueError(f"Unknown divide mode: {self.mode}")
+
 
 @dataclass(frozen=True)
 class FuncMove(Move):
@@ -84,6 +124,130 @@ class FuncMove(Move):
         return self.f(s)
 
 
+DIVISION_MODES = ("floor", "ceil", "round")
+
+# Деление нацело с нужным округлением через // и % - одинаково для int и массивов NumPy.
+# round, как и встроенный round, округляет половины к четному (при положительном делителе).
+_DIVISION_TEMPLATES = {
+    "floor": "(A) // (B)",
+    "ceil": "-(-(A) // (B))",
+    "round": "(A) // (B) + ((2 * ((A) % (B)) > (B)) | ((2 * ((A) % (B)) == (B)) & ((A) // (B) % 2 == 1)))",
+}
+
+
+class _MoveRewriter(ast.NodeTransformer):
+    """Подставляет параметры и заменяет / и // делением нацело с округлением rounding."""
+
+    def __init__(self, params: Dict[str, int], rounding: str) -> None:
+        self.params = params
+        self.rounding = rounding
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in self.params:
+            return ast.Constant(value=self.params[node.id])
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if not isinstance(node.op, (ast.Div, ast.FloorDiv)):
+            return node
+        template = ast.parse(_DIVISION_TEMPLATES[self.rounding], mode='eval').body
+        operands = {'A': node.left, 'B': node.right}
+
+        class Substitute(ast.NodeTransformer):
+            def visit_Name(self, name: ast.Name) -> ast.AST:
+                return operands.get(name.id, name)
+
+        return Substitute().visit(template)
+
+
+def _compile_move_part(text: str, params: Dict[str, int], rounding: str) -> CompiledExpression:
+    tree = compile_expression(text).tree
+    tree = _MoveRewriter(params, rounding).visit(ast.parse(ast.unparse(tree), mode='eval'))
+    compiled = compile_expression(ast.unparse(ast.fix_missing_locations(tree)))
+    unknown = compiled.names - {'s'}
+    if unknown:
+        raise UnsafeExpression(f"Неизвестные имена в ходе: {sorted(unknown)}")
+    return compiled
+
+
+@dataclass(frozen=True)
+class ExprMove(Move):
+    """
+    Ход, заданный формулой от s: "s*2+1", "s//3 ceil", "s-k if s>k" (с params={'k': 3}).
+    Слово floor / ceil / round в конце задает округление для / и // (по умолчанию floor),
+    хвост "if условие" без else - условие, при котором ход доступен.
+    Формула компилируется в обычную функцию и в векторную над массивами NumPy,
+    поэтому такие ходы участвуют в transition_table без поэлементного apply.
+    """
+    source: str
+    params: Tuple[Tuple[str, int], ...] = ()
+    name: str = field(init=False)
+    _body: Any = field(init=False, repr=False, compare=False)
+    _guard: Any = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        params = dict(self.params.items() if isinstance(self.params, dict) else self.params)
+        object.__setattr__(self, "params", tuple(sorted(params.items())))
+        object.__setattr__(self, "name", " ".join(self.source.split()))
+
+        body, guard = self.source.strip(), None
+        if re.search(r"\belse\b", body) is None:
+            parts = re.split(r"\s+if\s+", body, maxsplit=1)
+            if len(parts) == 2:
+                body, guard = parts
+        rounding = "floor"
+        match = re.fullmatch(r"(.*?)\s+(floor|ceil|round)\s*", body)
+        if match:
+            body, rounding = match.group(1), match.group(2)
+
+        object.__setattr__(self, "_body", _compile_move_part(body, params, rounding))
+        object.__setattr__(self, "_guard", None if guard is None else _compile_move_part(guard, params, rounding))
+
+    def apply(self, s: int) -> Optional[int]:
+        # Деление на ноль (в формуле или в условии) делает ход недоступным.
+        try:
+            if self._guard is not None and not self._guard.function(('s',))(s):
+                return None
+            return int(self._body.function(('s',))(s))
+        except ZeroDivisionError:
+            return None
+
+    @staticmethod
+    def _evaluate_part(part: CompiledExpression, s: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Значения формулы на массиве и маска состояний, где она вычислима (None - везде).
+        NumPy дает при делении на ноль 0, поэтому такие массивы пересчитываются
+        поэлементно - по тем же правилам, что и apply.
+        """
+        try:
+            with np.errstate(divide='raise', over='ignore', invalid='ignore'):
+                return np.broadcast_to(np.asarray(part.evaluate_array({'s': s})), s.shape), None
+        except FloatingPointError:
+            pass
+        function = part.function(('s',))
+        values, ok = np.zeros(len(s), dtype=np.int64), np.ones(len(s), dtype=bool)
+        for i, v in enumerate(s.tolist()):
+            try:
+                values[i] = function(v)
+            except ZeroDivisionError:
+                ok[i] = False
+        return values, ok
+
+    def apply_array(self, s: np.ndarray) -> np.ndarray:
+        return self._evaluate_part(self._body, s)[0].astype(np.int64)
+
+    def available_array(self, s: np.ndarray) -> Optional[np.ndarray]:
+        _, available = self._evaluate_part(self._body, s)
+        if self._guard is not None:
+            guard, guard_ok = self._evaluate_part(self._guard, s)
+            guard = guard.astype(bool)
+            if guard_ok is not None:
+                guard = guard & guard_ok
+            available = guard if available is None else guard & available
+        return available
+
+
 @dataclass(frozen=True)
 class TerminalCondition:
     threshold: int
@@ -97,70 +261,607 @@ class TerminalCondition:
         else:
             raise ValueError("Comparator must be 'le' or 'ge'")
 
+    def is_terminal_array(self, s: np.ndarray) -> np.ndarray:
+        if self.comparator == "le":
+            return s <= self.threshold
+        elif self.comparator == "ge":
+            return s >= self.threshold
+        else:
+            raise ValueError("Comparator must be 'le' or 'ge'")
 
 
 @dataclass
-class Game:
-    terminal: TerminalCondition
-    moves: List[Move]
+class TransitionTable:
+    """
+    Переходы в формате CSR: ходы из s_min + i - это targets[offsets[i]:offsets[i + 1]]
+    (различные, по возрастанию). Обратная таблица устроена так же: строка i -
+    состояния, из которых есть ход в s_min + i.
+    """
     s_min: int
-    s_max: int
-    monotonic: str = "decreasing"
+    offsets: np.ndarray
+    targets: np.ndarray
 
-    def next_states(self, s: int) -> List[int]:
-        return sorted({m.apply(s) for m in self.moves})
+    def row(self, s: int) -> np.ndarray:
+        i = s - self.s_min
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
 
+    def sources(self) -> np.ndarray:
+        """Состояние-источник каждого элемента targets."""
+        return np.repeat(np.arange(self.s_min, self.s_min + len(self.offsets) - 1, dtype=np.int64),
+                         np.diff(self.offsets))
 
+    def reverse(self, s_max: int) -> "TransitionTable":
+        """Таблица предшественников для состояний s_min..s_max (ходы за диапазон отбрасываются)."""
+        n = s_max - self.s_min + 1
+        inside = (self.targets >= self.s_min) & (self.targets <= s_max)
+        dst = self.targets[inside] - self.s_min
+        order = np.argsort(dst, kind='stable')
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=n), out=offsets[1:])
+        return TransitionTable(self.s_min, offsets, self.sources()[inside][order])
 
-class Analyzer:
-    def __init__(self, game: Game):
-        self.g = game
 
-    def classify_up_to_k2(self) -> Dict[int, str]:
-        g = self.g
-        t = g.terminal
-
-        labels: Dict[int, str] = {}
+@dataclass
+class RetrogradeGraph:
+    """
+    То, что нужно ретроградному анализу, по номерам состояний 0..n-1: конечные
+    состояния, число ходов из каждого, есть ли ход в конечное состояние, есть ли
+    ход за пределы диапазона в неконечное состояние (escapes) и обратная
+    CSR-таблица ходов внутри диапазона.
+    """
+    terminal: np.ndarray
+    moves_count: np.ndarray
+    has_terminal_move: np.ndarray
+    escapes: np.ndarray
+    reverse: TransitionTable
 
-        W: Dict[int, Set[int]] = {1: set(), 2: set()}
-        L: Dict[int, Set[int]] = {0: set(), 1: set(), 2: set()}
 
-        if t.comparator == "le":
-            L[0] = set(range(g.s_min, min(g.s_max, t.threshold) + 1))
-            state_iter = range(t.threshold + 1, g.s_max + 1)
-        else:
-            L[0] = set(range(max(g.s_min, t.threshold), g.s_max + 1))
-            state_iter = range(min(g.s_max, t.threshold - 1), g.s_min - 1, -1)
 
-        for s in state_iter:
-            dests = g.next_states(s)
-
-            if any(t.is_terminal(d) for d in dests):
-                labels[s] = "W1"
-                W[1].add(s)
-                continue
+@dataclass
+class Game:
+    terminal: TerminalCondition
+    moves: List[Move]
+    s_min: int
+    s_max: int
+    monotonic: str = "decreasing"
 
-            if dests and all(d in W[1] for d in dests):
-                labels[s] = "L1"
-                L[1].add(s)
-                continue
+    def is_terminal(self, s: int) -> bool:
+        return self.terminal.is_terminal(s)
 
-            if any(d in L[1] for d in dests):
-                labels[s] = "W2"
-                W[2].add(s)
-                continue
+    def next_states(self, s: int) -> List[int]:
+        return sorted({d for d in (m.apply(s) for m in self.moves) if d is not None})
+
+    def transition_table(self) -> TransitionTable:
+        """
+        Все ходы из s_min..s_max одной таблицей: каждый ход применяется сразу ко всему
+        массиву состояний, затем строки сортируются и из них убираются повторы -
+        то же, что next_states, но без вызова apply на каждое состояние.
+        """
+        states = np.arange(self.s_min, self.s_max + 1, dtype=np.int64)
+        if not self.moves:
+            return TransitionTable(self.s_min, np.zeros(len(states) + 1, dtype=np.int64),
+                                   np.zeros(0, dtype=np.int64))
+        dests = np.column_stack([m.apply_array(states) for m in self.moves])
+        # Недоступные ходы заменяются на максимальное int64: после сортировки они в конце строки.
+        unavailable = np.iinfo(np.int64).max
+        for j, move in enumerate(self.moves):
+            available = move.available_array(states)
+            if available is not None:
+                dests[~available, j] = unavailable
+        dests.sort(axis=1)
+        keep = dests != unavailable
+        keep[:, 1:] &= dests[:, 1:] != dests[:, :-1]
+        offsets = np.zeros(len(states) + 1, dtype=np.int64)
+        np.cumsum(keep.sum(axis=1), out=offsets[1:])
+        return TransitionTable(self.s_min, offsets, dests[keep])
+
+    @property
+    def size(self) -> int:
+        return max(0, self.s_max - self.s_min + 1)
+
+    def retrograde_graph(self) -> RetrogradeGraph:
+        table = self.transition_table()
+        n = self.size
+        terminal = self.terminal.is_terminal_array(np.arange(self.s_min, self.s_max + 1, dtype=np.int64))
+        moves_count = np.diff(table.offsets)
+        edge_row = np.repeat(np.arange(n), moves_count)
+        terminal_edge = self.terminal.is_terminal_array(table.targets)
+        has_terminal_move = np.bincount(edge_row[terminal_edge], minlength=n) > 0
+        outside = (table.targets < self.s_min) | (table.targets > self.s_max)
+        escapes = np.bincount(edge_row[outside & ~terminal_edge], minlength=n) > 0
+        reverse = table.reverse(self.s_max)
+        return RetrogradeGraph(terminal, moves_count, has_terminal_move, escapes,
+                               TransitionTable(0, reverse.offsets, reverse.targets - self.s_min))
+
+    def label_view(self, outcome: np.ndarray, depth: np.ndarray) -> "LabelView":
+        return LabelView(self.s_min, outcome, depth)
 
-            if dests and all((d in W[1] or d in W[2]) for d in dests):
-                labels[s] = "L2"
-                L[2].add(s)
-                continue
 
-            labels[s] = "UNRESOLVED"
+@dataclass
+class PileGame:
+    """
+    Игра с несколькими кучами: состояние - кортеж размеров куч, каждый ход
+    применяется к одной выбранной куче, конечность определяется по сумме куч
+    (например, a + b >= T). Размер каждой кучи - от pile_min до pile_max;
+    состояние хранится одним числом (a - pile_min) * width + (b - pile_min)
+    (для большего числа куч - так же, по разрядам), поэтому все состояния -
+    это плоский массив из width ** piles элементов.
+    """
+    terminal: TerminalCondition
+    moves: List[Move]
+    pile_min: int
+    pile_max: int
+    piles: int = 2
+
+    @property
+    def width(self) -> int:
+        return max(0, self.pile_max - self.pile_min + 1)
+
+    @property
+    def size(self) -> int:
+        return self.width ** self.piles
+
+    def index(self, state: Tuple[int, ...]) -> int:
+        i = 0
+        for v in state:
+            i = i * self.width + (v - self.pile_min)
+        return i
+
+    def state(self, i: int) -> Tuple[int, ...]:
+        values = []
+        for _ in range(self.piles):
+            i, r = divmod(i, self.width)
+            values.append(r + self.pile_min)
+        return tuple(reversed(values))
+
+    def is_terminal(self, state: Tuple[int, ...]) -> bool:
+        return self.terminal.is_terminal(sum(state))
+
+    def next_states(self, state: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        result = set()
+        for p, v in enumerate(state):
+            for m in self.moves:
+                d = m.apply(v)
+                if d is not None:
+                    result.add(state[:p] + (d,) + state[p + 1:])
+        return sorted(result)
+
+    def retrograde_graph(self) -> RetrogradeGraph:
+        """
+        Каждый ход применяется к каждой куче сразу для всего плоского массива
+        состояний. Ход, после которого куча выходит за pile_min..pile_max, учитывается
+        только как ход в конечное состояние (по сумме) или как ход наружу, который
+        не разрешается никогда - так же, как выход за s_min..s_max в Game.
+        """
+        n, width = self.size, self.width
+        idx = np.arange(n, dtype=np.int64)
+        coords = np.stack(np.unravel_index(idx, (width,) * self.piles)).astype(np.int64) + self.pile_min
+        total = coords.sum(axis=0)
+        terminal = self.terminal.is_terminal_array(total)
+
+        moves_count = np.zeros(n, dtype=np.int64)
+        has_terminal_move = np.zeros(n, dtype=bool)
+        escapes = np.zeros(n, dtype=bool)
+        src, dst = [], []
+        for p in range(self.piles):
+            stride = width ** (self.piles - 1 - p)
+            for move in self.moves:
+                new = move.apply_array(coords[p])
+                valid = move.available_array(coords[p])
+                if valid is None:
+                    valid = np.ones(n, dtype=bool)
+                moves_count += valid
+                terminal_move = valid & self.terminal.is_terminal_array(total - coords[p] + new)
+                has_terminal_move |= terminal_move
+                inside = valid & (new >= self.pile_min) & (new <= self.pile_max)
+                escapes |= valid & ~inside & ~terminal_move
+                src.append(idx[inside])
+                dst.append(idx[inside] + (new[inside] - coords[p][inside]) * stride)
+
+        # Повторяющиеся ходы не убираются: они одинаково учтены и в moves_count,
+        # и в таблице предшественников, поэтому счетчики остаются согласованными.
+        src, dst = np.concatenate(src), np.concatenate(dst)
+        order = np.argsort(dst, kind='stable')
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=n), out=offsets[1:])
+        return RetrogradeGraph(terminal, moves_count, has_terminal_move, escapes,
+                               TransitionTable(0, offsets, src[order]))
+
+    def label_view(self, outcome: np.ndarray, depth: np.ndarray) -> "PileLabelView":
+        return PileLabelView(self, outcome, depth)
+
+
+
+WIN, LOSS, UNRESOLVED, DRAW = 1, -1, 0, 2
+
+
+def _label_text(outcome: int, depth: int) -> str:
+    if outcome == UNRESOLVED:
+        return "UNRESOLVED"
+    if outcome == DRAW:
+        return "DRAW"
+    return f"{'W' if outcome == WIN else 'L'}{depth}"
+
+
+def _label_mask(outcome: np.ndarray, depth: np.ndarray, label: str,
+                present: Optional[np.ndarray] = None) -> np.ndarray:
+    if label == "UNRESOLVED":
+        mask = outcome == UNRESOLVED
+    elif label == "DRAW":
+        mask = outcome == DRAW
+    else:
+        kind = WIN if label[0] == "W" else LOSS
+        mask = (outcome == kind) & (depth == int(label[1:]))
+    return mask if present is None else mask & present
+
+
+def _non_terminal(outcome: np.ndarray, depth: np.ndarray) -> np.ndarray:
+    # L0 бывает только у конечных состояний: остальные проигрыши получают глубину от 1.
+    return (outcome != LOSS) | (depth != 0)
+
+
+class LabelView(Mapping):
+    """
+    Разметка состояний s_min..s_max поверх массивов: outcome (int8: WIN / LOSS /
+    DRAW / UNRESOLVED) и depth (int32: число ходов до конца) с индексом s - s_min.
+    Ведет себя как Dict[int, str] с метками "W3", "L0", "DRAW", "UNRESOLVED", но строки
+    создаются только при обращении, а выборки по метке делаются векторно.
+    present - маска состояний, которые есть в словаре (None - все).
+    """
+
+    def __init__(self, s_min: int, outcome: np.ndarray, depth: np.ndarray,
+                 present: Optional[np.ndarray] = None):
+        self.s_min = s_min
+        self.outcome = outcome
+        self.depth = depth
+        self.present = present
+
+    def __getitem__(self, s: int) -> str:
+        i = s - self.s_min
+        if not 0 <= i < len(self.outcome) or (self.present is not None and not self.present[i]):
+            raise KeyError(s)
+        return _label_text(self.outcome[i], self.depth[i])
+
+    def __iter__(self) -> Iterator[int]:
+        if self.present is not None:
+            return iter((np.flatnonzero(self.present) + self.s_min).tolist())
+        return iter(range(self.s_min, self.s_min + len(self.outcome)))
+
+    def __len__(self) -> int:
+        return len(self.outcome) if self.present is None else int(np.count_nonzero(self.present))
+
+    def states_with(self, label: str) -> np.ndarray:
+        """Все состояния с меткой label по возрастанию."""
+        return np.flatnonzero(_label_mask(self.outcome, self.depth, label, self.present)) + self.s_min
+
+    def without_terminal(self) -> "LabelView":
+        """Та же разметка без конечных состояний (L0)."""
+        return LabelView(self.s_min, self.outcome, self.depth, _non_terminal(self.outcome, self.depth))
+
+
+class PileLabelView(Mapping):
+    """
+    Разметка состояний PileGame: как LabelView, но ключи - кортежи размеров куч,
+    а массивы outcome/depth (и маска present) индексируются плоским номером состояния.
+    """
+
+    def __init__(self, game: PileGame, outcome: np.ndarray, depth: np.ndarray,
+                 present: Optional[np.ndarray] = None):
+        self.game = game
+        self.outcome = outcome
+        self.depth = depth
+        self.present = present
+
+    def __getitem__(self, state: Tuple[int, ...]) -> str:
+        g = self.game
+        if len(state) != g.piles or not all(g.pile_min <= v <= g.pile_max for v in state):
+            raise KeyError(state)
+        i = g.index(state)
+        if self.present is not None and not self.present[i]:
+            raise KeyError(state)
+        return _label_text(self.outcome[i], self.depth[i])
+
+    def __iter__(self) -> Iterator[Tuple[int, ...]]:
+        g = self.game
+        states = itertools.product(range(g.pile_min, g.pile_max + 1), repeat=g.piles)
+        if self.present is None:
+            return states
+        return itertools.compress(states, self.present.tolist())
+
+    def __len__(self) -> int:
+        return len(self.outcome) if self.present is None else int(np.count_nonzero(self.present))
+
+    def states_with(self, label: str) -> np.ndarray:
+        """Состояния с меткой label - массив формы (число состояний, piles)."""
+        g = self.game
+        flat = np.flatnonzero(_label_mask(self.outcome, self.depth, label, self.present))
+        return np.stack(np.unravel_index(flat, (g.width,) * g.piles), axis=1) + g.pile_min
+
+    def without_terminal(self) -> "PileLabelView":
+        """Та же разметка без конечных состояний (L0)."""
+        return PileLabelView(self.game, self.outcome, self.depth, _non_terminal(self.outcome, self.depth))
+
+    def line(self, *fixed: int) -> LabelView:
+        """
+        Разметка по последней куче при заданных размерах остальных: line(7) -
+        состояния (7, S) как LabelView по S (без копирования массивов).
+        """
+        g = self.game
+        if len(fixed) != g.piles - 1:
+            raise ValueError(f"Нужно задать размеры {g.piles - 1} куч")
+        start = g.index(tuple(fixed) + (g.pile_min,))
+        end = start + g.width
+        present = None if self.present is None else self.present[start:end]
+        return LabelView(g.pile_min, self.outcome[start:end], self.depth[start:end], present)
+
+
+ProgressCallback = Callable[[int, int, Mapping], None]
+
+PROGRESS_EVERY = 256
+TRANSPOSITION_TABLE_SIZE = 1 << 20
+VECTOR_LAYER_MIN = 64
 
-        return labels
 
-    def solve_19_20_21(self) -> Dict[str, Union[int, List[int], None]]:
+class Analyzer:
+    """
+    :param progress: Вызывается по ходу разметки как progress(размечено, всего, labels);
+                     labels - частичная разметка, ее не следует менять.
+    :param cancel_event: Если установлен, разметка останавливается, а cancelled становится True.
+    """
+
+    def __init__(self, game: Union[Game, PileGame], progress: Optional[ProgressCallback] = None,
+                 cancel_event: Optional[threading.Event] = None):
+        self.g = game
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self.cancelled = False
+        # Таблица solve_state: состояние -> (outcome, depth), для неразрешенных -
+        # (UNRESOLVED, глубина, до которой состояние проверено).
+        self._table: OrderedDict = OrderedDict()
+        self.table_size = TRANSPOSITION_TABLE_SIZE
+
+    def _report(self, done: int, total: int, labels: Mapping) -> bool:
+        """Сообщает о ходе разметки; True - разметка отменена."""
+        if self.progress is not None:
+            self.progress(done, total, labels)
+        return self._cancel_requested()
+
+    def _cancel_requested(self) -> bool:
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def classify(self, max_depth: Optional[int] = None) -> Union[LabelView, PileLabelView]:
+        """
+        Метки всех состояний игры: Wk - есть ход в Lk-1, Lk - все ходы ведут в
+        выигрыши (наибольший - Wk), конечные состояния - L0. Без max_depth ничьи
+        на циклах получают метку "DRAW". "UNRESOLVED" остаются состояния глубже
+        max_depth и те, исход которых зависит от хода за пределы s_min..s_max
+        в неконечное состояние.
+        """
+        g = self.g
+        n = g.size
+
+        outcome = np.zeros(n, dtype=np.int8)
+        depth = np.zeros(n, dtype=np.int32)
+        # Представление поверх тех же массивов: в progress уходит живая разметка.
+        view = g.label_view(outcome, depth)
+        if n == 0:
+            return view
+        self._report(0, n, view)
+
+        # Обратные ходы строятся один раз CSR-таблицей (у PileGame - по плоскому номеру
+        # состояния), дальше все слои обрабатываются по ней.
+        graph = g.retrograde_graph()
+        if self._cancel_requested():
+            self.cancelled = True
+            return view
+
+        terminal = graph.terminal
+        wins_idx = np.flatnonzero(~terminal & graph.has_terminal_move)
+        outcome[terminal] = LOSS
+        outcome[wins_idx] = WIN
+        depth[wins_idx] = 1
+        # Число ходов, еще не ставших выигрышами соперника: проигрыш фиксируется, когда
+        # разрешен последний ход, а на циклах счетчик не обнуляется никогда.
+        remaining = np.where(outcome == UNRESOLVED, graph.moves_count, 0).astype(np.int32)
+        pred_offsets, pred_src = graph.reverse.offsets, graph.reverse.targets
+
+        resolved = int(np.count_nonzero(terminal)) + wins_idx.size
+        if self._report(resolved, n, view):
+            self.cancelled = True
+            return view
+        self.cancelled = self._propagate(outcome, depth, remaining, pred_offsets, pred_src,
+                                         wins_idx, max_depth, view, resolved)
+        if not self.cancelled and max_depth is None:
+            self.cancelled = self._mark_draws(outcome, graph.escapes, pred_offsets, pred_src)
+        if not self.cancelled:
+            self._report(n, n, view)
+        return view
+
+    @staticmethod
+    def _gather(offsets: np.ndarray, targets: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Склеенные строки rows CSR-таблицы (offsets, targets)."""
+        starts = offsets[rows]
+        lengths = offsets[rows + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return targets[:0]
+        shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return targets[shifts + np.arange(total)]
+
+    def _propagate(self, outcome: np.ndarray, depth: np.ndarray, remaining: np.ndarray,
+                   pred_offsets: np.ndarray, pred_src: np.ndarray, wins: np.ndarray,
+                   max_depth: Optional[int], view: Mapping, resolved: int) -> bool:
+        """
+        Послойное распространение от выигрышей в 1 ход по обратным ходам. Большие
+        слои обрабатываются векторно, маленькие (в играх с ходом +1 их сотни тысяч) -
+        обычным циклом, чтобы не платить накладные расходы NumPy за каждый слой.
+
+        О ходе сообщается после каждого процента размеченных состояний, отмена
+        проверяется не реже чем раз в PROGRESS_EVERY слоев. True - разметка отменена
+        (уже размеченные слои остаются верными).
+        """
+        n = len(outcome)
+        step = max(1, n // 100)
+        reported = resolved
+        k = 1
+        while wins.size:
+            if wins.size < VECTOR_LAYER_MIN:
+                losses = []
+                for w in wins.tolist():
+                    for p in pred_src[pred_offsets[w]:pred_offsets[w + 1]].tolist():
+                        if outcome[p] == UNRESOLVED:
+                            remaining[p] -= 1
+                            if remaining[p] == 0:
+                                losses.append(p)
+                losses = np.array(losses, dtype=np.int64)
+            else:
+                preds = self._gather(pred_offsets, pred_src, wins)
+                preds, counts = np.unique(preds[outcome[preds] == UNRESOLVED], return_counts=True)
+                remaining[preds] -= counts.astype(np.int32)
+                losses = preds[remaining[preds] == 0]
+            outcome[losses] = LOSS
+            depth[losses] = k
+            if max_depth is not None and k >= max_depth:
+                break
+
+            if losses.size < VECTOR_LAYER_MIN:
+                found = set()
+                for q in losses.tolist():
+                    found.update(p for p in pred_src[pred_offsets[q]:pred_offsets[q + 1]].tolist()
+                                 if outcome[p] == UNRESOLVED)
+                wins = np.array(sorted(found), dtype=np.int64)
+            else:
+                preds = self._gather(pred_offsets, pred_src, losses)
+                wins = np.unique(preds[outcome[preds] == UNRESOLVED])
+            outcome[wins] = WIN
+            depth[wins] = k + 1
+            k += 1
+
+            resolved += losses.size + wins.size
+            if resolved - reported >= step:
+                reported = resolved
+                if self._report(resolved, n, view):
+                    return True
+            elif k % PROGRESS_EVERY == 0 and self._cancel_requested():
+                return True
+        return False
+
+    def _mark_draws(self, outcome: np.ndarray, escapes: np.ndarray,
+                    pred_offsets: np.ndarray, pred_src: np.ndarray) -> bool:
+        """
+        Неразрешенные состояния, из которых есть ход наружу, и все их неразрешенные
+        предшественники (обход в ширину по обратным ходам) остаются "UNRESOLVED",
+        остальные неразрешенные - ничьи. True - обход отменен, тогда ничьи не
+        отмечаются вовсе.
+        """
+        unknown = (outcome == UNRESOLVED) & escapes
+        frontier = np.flatnonzero(unknown)
+        while frontier.size >= VECTOR_LAYER_MIN:
+            if self._cancel_requested():
+                return True
+            preds = self._gather(pred_offsets, pred_src, frontier)
+            frontier = np.unique(preds[(outcome[preds] == UNRESOLVED) & ~unknown[preds]])
+            unknown[frontier] = True
+        # Порядок обхода здесь не важен, поэтому узкий фронт (цепочки ходов +1/-1)
+        # дообходится стеком без накладных расходов на слои.
+        stack = frontier.tolist()
+        visited = 0
+        while stack:
+            visited += 1
+            if visited % PROGRESS_EVERY == 0 and self._cancel_requested():
+                return True
+            q = stack.pop()
+            for p in pred_src[pred_offsets[q]:pred_offsets[q + 1]].tolist():
+                if outcome[p] == UNRESOLVED and not unknown[p]:
+                    unknown[p] = True
+                    stack.append(p)
+        outcome[(outcome == UNRESOLVED) & ~unknown] = DRAW
+        return False
+
+    def solve_state(self, s: Union[int, Tuple[int, ...]], depth: int) -> str:
+        """
+        Метка одного состояния с глубиной не больше depth ("W2", "L1", "UNRESOLVED")
+        без разметки всего диапазона: перебор с ограничением глубины только по
+        достижимым из s состояниям, поэтому годится и для s порядка 10^12.
+        Границы s_min..s_max здесь не действуют. Результаты запоминаются в
+        таблице на table_size состояний (вытесняются давно не использованные)
+        и переиспользуются следующими вызовами.
+        """
+        outcome, d = self._search(s, 2 * depth)
+        return _label_text(outcome, d)
+
+    @staticmethod
+    def _plies(outcome: int, depth: int) -> int:
+        """Длина партии в полуходах: Wk - 2k - 1, Lk - 2k."""
+        return 2 * depth - 1 if outcome == WIN else 2 * depth
+
+    def _search(self, s, n: int) -> Tuple[int, int]:
+        """(outcome, depth) состояния s, если партия из него кончается за n полуходов, иначе (UNRESOLVED, 0)."""
+        g = self.g
+        if g.is_terminal(s):
+            return LOSS, 0
+        table = self._table
+        entry = table.get(s)
+        if entry is not None:
+            table.move_to_end(s)
+            outcome, d = entry
+            if outcome != UNRESOLVED:
+                return entry if self._plies(outcome, d) <= n else (UNRESOLVED, 0)
+            if d >= n:
+                return UNRESOLVED, 0
+        if n == 0:
+            return UNRESOLVED, 0
+
+        moves = g.next_states(s)
+        # Сначала ходы в конечные состояния: такой ход сразу дает W1.
+        if any(g.is_terminal(d) for d in moves):
+            result = (WIN, 1)
+        else:
+            best_loss = None
+            all_wins, worst_win = bool(moves), 0
+            for d in moves:
+                outcome, j = self._search(d, n - 1)
+                if outcome == LOSS:
+                    all_wins = False
+                    if best_loss is None or j < best_loss:
+                        best_loss = j
+                        if j == 1:
+                            break
+                elif outcome == WIN:
+                    worst_win = max(worst_win, j)
+                else:
+                    all_wins = False
+            if best_loss is not None:
+                result = (WIN, best_loss + 1)
+            elif all_wins:
+                result = (LOSS, worst_win)
+            else:
+                result = (UNRESOLVED, n)
+
+        table[s] = result
+        table.move_to_end(s)
+        if len(table) > self.table_size:
+            table.popitem(last=False)
+        return result if result[0] != UNRESOLVED else (UNRESOLVED, 0)
+
+    def classify_up_to_k2(self) -> Union[LabelView, PileLabelView]:
+        """Метки W1/L1/W2/L2 неконечных состояний (более глубокие - "UNRESOLVED")."""
+        return self.classify(max_depth=2).without_terminal()
+
+    def solve_19_20_21(self, *fixed: int) -> Dict[str, Union[int, List[int], None]]:
+        """Для PileGame в fixed задаются размеры всех куч, кроме последней: ответы - по ней."""
         labels = self.classify_up_to_k2()
+        if isinstance(labels, PileLabelView):
+            labels = labels.line(*fixed)
+        return self.results_from_labels(labels)
+
+    @staticmethod
+    def results_from_labels(labels: Mapping) -> Dict[str, Union[int, List[int], None]]:
+        if isinstance(labels, LabelView):
+            l1, w2, l2 = (labels.states_with(lab) for lab in ("L1", "W2", "L2"))
+            return {"19": int(l1[0]) if l1.size else None,
+                    "20": w2[:2].tolist(),
+                    "21": int(l2[0]) if l2.size else None}
 
         s19 = min((s for s, lab in labels.items() if lab == "L1"), default=None)
 
@@ -1,15 +1,55 @@
 import sys
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout,
                              QWidget, QGroupBox, QLabel, QSpinBox, QComboBox,
                              QPushButton, QListWidget, QListWidgetItem,
                              QTabWidget, QTextEdit, QMessageBox, QFormLayout,
-                             QDialog, QDialogButtonBox)
+                             QDialog, QDialogButtonBox, QProgressBar, QLineEdit)
 
 from auto_solver import (
     Game, Analyzer, TerminalCondition,
-    AddMove, SubtractMove, MultiplyMove, DivideMove
+    AddMove, SubtractMove, MultiplyMove, DivideMove, ExprMove
 )
 
+PARTIAL_INTERVAL = 0.3
+
+
+class AnalyzeWorker(QThread):
+    """
+    Анализирует игру в отдельном потоке. progress(размечено, всего) и partial(результаты
+    по частичной разметке, не чаще PARTIAL_INTERVAL секунд) приходят в поток окна сигналами.
+    """
+    progress = pyqtSignal(int, int)
+    partial = pyqtSignal(object)
+    solved = pyqtSignal(object, bool)
+    failed = pyqtSignal(str)
+
+    def __init__(self, game, parent=None):
+        super().__init__(parent)
+        self.game = game
+        self.cancel_event = threading.Event()
+        self._last_partial = 0.0
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _on_progress(self, done, total, labels):
+        self.progress.emit(done, total)
+        now = time.monotonic()
+        if now - self._last_partial >= PARTIAL_INTERVAL:
+            self._last_partial = now
+            self.partial.emit(Analyzer.results_from_labels(labels))
+
+    def run(self):
+        try:
+            analyzer = Analyzer(self.game, self._on_progress, self.cancel_event)
+            results = analyzer.solve_19_20_21()
+            self.solved.emit(results, analyzer.cancelled)
+        except Exception as e:
+            self.failed.emit(str(e))
+
 
 class MoveDialog(QDialog):
     def __init__(self, parent=None):
@@ -24,14 +64,18 @@ class MoveDialog(QDialog):
         form_layout = QFormLayout()
 
         self.move_type = QComboBox()
-        self.move_type.addItems(["Сложить", "Вычесть", "Умножить", "Разделить"])
+        self.move_type.addItems(["Сложить", "Вычесть", "Умножить", "Разделить", "Формула"])
         self.move_type.currentTextChanged.connect(self.on_move_type_changed)
 
         self.value_input = QSpinBox()
         self.value_input.setRange(1, 1000)
 
+        self.formula_input = QLineEdit()
+        self.formula_input.setPlaceholderText("s*2+1, s//3 ceil, s-3 if s>3")
+
         form_layout.addRow("Тип хода:", self.move_type)
         form_layout.addRow("Значение:", self.value_input)
+        form_layout.addRow("Формула:", self.formula_input)
 
         layout.addLayout(form_layout)
 
@@ -44,7 +88,9 @@ class MoveDialog(QDialog):
         self.setLayout(layout)
 
     def on_move_type_changed(self, move_type):
-        self.value_input.setVisible(True)
+        is_formula = move_type == "Формула"
+        self.value_input.setEnabled(not is_formula)
+        self.formula_input.setEnabled(is_formula)
 
     def validate_and_accept(self):
         move_type = self.move_type.currentText()
@@ -58,6 +104,12 @@ class MoveDialog(QDialog):
             self.move_obj = MultiplyMove(val)
         elif move_type == "Разделить":
             self.move_obj = DivideMove(val)
+        elif move_type == "Формула":
+            try:
+                self.move_obj = ExprMove(self.formula_input.text())
+            except (SyntaxError, ValueError) as e:
+                QMessageBox.warning(self, "Ошибка", f"Некорректная формула хода: {e}")
+                return
 
         self.accept()
 
@@ -178,8 +230,10 @@ class ResultsWidget(QGroupBox):
         layout.addWidget(self.results_text)
         self.setLayout(layout)
 
-    def update_results(self, results, full_analysis=None):
+    def update_results(self, results, full_analysis=None, note=None):
         text = "<h3>Результаты игры</h3>"
+        if note:
+            text += f"<i>{note}</i><br/>"
         text += f"<b>Задание 19 (мин L1):</b> {results['19']}<br/>"
 
         res20 = results['20']
@@ -197,6 +251,7 @@ class GameAnalyzerGUI(QMainWindow):
         super().__init__()
         self.setWindowTitle("Солвер 19-21 задание ЕГЭ")
         self.setGeometry(100, 100, 800, 600)
+        self._worker = None
         self.init_ui()
 
     def init_ui(self):
@@ -213,6 +268,14 @@ class GameAnalyzerGUI(QMainWindow):
         self.analyze_btn = QPushButton("Проанализировать игру")
         self.analyze_btn.clicked.connect(self.analyze_game)
 
+        self.cancel_btn = QPushButton("Остановить анализ")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_analysis)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+
         tab_widget = QTabWidget()
 
         config_tab = QWidget()
@@ -220,7 +283,11 @@ class GameAnalyzerGUI(QMainWindow):
         config_layout.addWidget(self.terminal_widget)
         config_layout.addWidget(self.moves_widget)
         config_layout.addWidget(self.settings_widget)
-        config_layout.addWidget(self.analyze_btn)
+        analyze_layout = QHBoxLayout()
+        analyze_layout.addWidget(self.analyze_btn)
+        analyze_layout.addWidget(self.cancel_btn)
+        config_layout.addLayout(analyze_layout)
+        config_layout.addWidget(self.progress_bar)
         config_tab.setLayout(config_layout)
 
         results_tab = QWidget()
@@ -255,15 +322,70 @@ class GameAnalyzerGUI(QMainWindow):
                 monotonic=monotonic_str,
             )
 
-            analyzer = Analyzer(game)
-            results = analyzer.solve_19_20_21()
+            self._start(game)
 
-            self.results_widget.update_results(results)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка анализа", f"Произошла ошибка: {str(e)}")
 
+    def _start(self, game):
+        worker = AnalyzeWorker(game, self)
+        worker.progress.connect(self._on_progress)
+        worker.partial.connect(self._on_partial)
+        worker.solved.connect(self._on_solved)
+        worker.failed.connect(self._on_failed)
+        worker.finished.connect(worker.deleteLater)
+        self._worker = worker
+
+        self.analyze_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.progress_bar.setRange(0, 0)
+        worker.start()
+
+    def cancel_analysis(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self.cancel_btn.setEnabled(False)
+
+    def _on_progress(self, done, total):
+        if self.sender() is not self._worker:
+            return
+        self.progress_bar.setRange(0, max(1, total))
+        self.progress_bar.setValue(done)
+        self.progress_bar.setFormat(f"{done} / {total}")
+
+    def _on_partial(self, results):
+        if self.sender() is self._worker:
+            self.results_widget.update_results(results, note="Промежуточный результат, анализ продолжается")
+
+    def _on_solved(self, results, cancelled):
+        if self.sender() is not self._worker:
+            return
+        self._finish()
+        if cancelled:
+            self.results_widget.update_results(results, note="Анализ остановлен, результат по размеченной части")
+        else:
+            self.results_widget.update_results(results)
             QMessageBox.information(self, "Готово", "Анализ завершен успешно!")
 
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка анализа", f"Произошла ошибка: {str(e)}")
+    def _on_failed(self, message):
+        if self.sender() is not self._worker:
+            return
+        self._finish()
+        QMessageBox.critical(self, "Ошибка анализа", f"Произошла ошибка: {message}")
+
+    def _finish(self):
+        self._worker = None
+        self.analyze_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        if self.progress_bar.maximum() == 0:
+            self.progress_bar.setRange(0, 1)
+            self.progress_bar.setValue(1)
+
+    def closeEvent(self, event):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker.wait()
+        super().closeEvent(event)
 
     def _get_monotonic(self) -> str:
         monotonic = self.settings_widget.monotonic.currentText()
@@ -1,77 +1,299 @@
 import itertools
-from typing import List, Tuple, Optional
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Tuple, Optional
+
+from common.safe_eval import compile_expression
+from matching import hopcroft_karp
+from truth_table import BitmaskTruthTable, TruthTable, UnsupportedExpression
+
+
+@dataclass
+class SearchStats:
+    """Счетчики последнего вызова LogicSolver.solve."""
+    assignments_tried: int = 0
+    row_checks: int = 0
+    rows_scanned: int = 0
+    sat_conflicts: int = 0
+    nogood_hits: int = 0
+    elapsed: float = 0.0
+
+
+class SearchCancelled(Exception):
+    """Поиск прерван через cancel_event."""
+
+
+class SearchCache:
+    """
+    Состояние поиска, которое переживает правки фрагмента: таблица истинности
+    текущего выражения и «тупиковые» префиксы назначения столбцов.
+    Префикс, отброшенный из-за строки фрагмента (значения в уже назначенных
+    столбцах + F), остается тупиковым, пока во фрагменте есть такая же строка.
+    При смене выражения, переменных или представления таблицы все сбрасывается.
+    """
+
+    def __init__(self, max_nogoods: int = 200_000) -> None:
+        self.max_nogoods = max_nogoods
+        self.key: Optional[Tuple] = None
+        self.table: Optional[TruthTable] = None
+        self.nogoods: Dict[Tuple[int, ...], Tuple[Tuple[Optional[bool], ...], bool]] = {}
+
+    def prepare(self, key: Tuple) -> None:
+        if key != self.key:
+            self.key = key
+            self.table = None
+            self.nogoods.clear()
+
+    def add_nogood(self, prefix: Tuple[int, ...],
+                   signature: Tuple[Tuple[Optional[bool], ...], bool]) -> None:
+        if len(self.nogoods) >= self.max_nogoods:
+            self.nogoods.clear()
+        self.nogoods[prefix] = signature
 
 
 class LogicSolver:
     def __init__(self, fragment: List[List[Optional[bool]]],
                  results: List[bool],
                  expression: str,
-                 variables: List[str]) -> None:
+                 variables: List[str],
+                 use_index: bool = True,
+                 distinct_rows: bool = False,
+                 backend: str = "bitmask",
+                 cache: Optional[SearchCache] = None,
+                 cancel_event: Optional[threading.Event] = None) -> None:
         """
         :param fragment: Фрагмент таблицы (None - пустая ячейка, True/False - значения).
         :param results: Столбец результатов F.
         :param expression: Выражение на языке Python (например: 'x and y or not z').
         :param variables: Список имен переменных ['x', 'y', 'z'].
+        :param use_index: Проверять строки фрагмента пересечением битовых масок
+                          (False - линейный просмотр таблицы, для сравнения).
+        :param distinct_rows: Строгий режим: разные строки фрагмента должны
+                              соответствовать разным строкам полной таблицы.
+        :param backend: Способ поиска: "bitmask" (таблица из целых чисел Python),
+                        "numpy" (упакованные массивы, нужен NumPy) или "sat"
+                        (кодирование в КНФ и CDCL, без построения полной таблицы;
+                        для выражений вне логического подмножества - как "bitmask").
+        :param cache: Общий для нескольких решений SearchCache (таблица и тупиковые префиксы).
+        :param cancel_event: Если событие установлено, поиск бросает SearchCancelled.
         """
         self.fragment = fragment
         self.results = results
         self.expression = expression
         self.variables = variables
         self.n_vars = len(variables)
+        self.use_index = use_index
+        self.distinct_rows = distinct_rows
+        if backend not in ("bitmask", "numpy", "sat"):
+            raise ValueError(f"Unknown backend: {backend}")
+        self.backend = backend
+        self.cache = cache
+        self.cancel_event = cancel_event
+        self.stats = SearchStats()
+        self._scan_rows: Dict[bool, List[int]] = {}
+        self._dead_row = -1
+        self._row_signatures: List[set] = []
 
     def _evaluate(self, values: Tuple[int, ...], var_names: Tuple[str, ...]) -> bool:
-        context = dict(zip(var_names, values))
         try:
-            return bool(eval(self.expression, {}, context))
+            return bool(compile_expression(self.expression).function(var_names)(*values))
         except Exception:
             return False
 
-    def _generate_full_table(self) -> List[Tuple[Tuple[int, ...], bool]]:
-        all_inputs = list(itertools.product([0, 1], repeat=self.n_vars))
-        table = []
-        for row in all_inputs:
-            res = self._evaluate(row, tuple(self.variables))
-            table.append((row, res))
-        return table
+    def _table_class(self):
+        if self.backend == "numpy":
+            from numpy_table import NumpyTruthTable
+            return NumpyTruthTable
+        return BitmaskTruthTable
+
+    def _generate_full_table(self) -> TruthTable:
+        if self.cache is not None:
+            self.cache.prepare((self.expression, tuple(self.variables), self.backend))
+            if self.cache.table is None:
+                self.cache.table = self._build_full_table()
+            return self.cache.table
+        return self._build_full_table()
+
+    def _build_full_table(self) -> TruthTable:
+        table_class = self._table_class()
+        try:
+            return table_class.from_expression(self.expression, self.variables)
+        except UnsupportedExpression:
+            # Выражение вне логического подмножества (арифметика, вызовы и т.п.) -
+            # считаем построчно через eval, как раньше.
+            var_names = tuple(self.variables)
+            all_inputs = itertools.product([0, 1], repeat=self.n_vars)
+            return table_class.from_rows(
+                self.variables, (self._evaluate(row, var_names) for row in all_inputs))
 
     def _rows_match(self, fragment_row: List[Optional[bool]], full_row: Tuple[int, ...]) -> bool:
         """
         Проверяет совместимость строки фрагмента и строки полной таблицы.
+        Если full_row короче строки фрагмента, сравниваются только первые столбцы.
         """
         for f_val, full_val in zip(fragment_row, full_row):
             if f_val is not None and f_val != full_val:
                 return False
         return True
 
-    def solve(self) -> str:
-        full_table = self._generate_full_table()
+    def _row_has_match(self, table: TruthTable, rows: List[int],
+                       fragment_row: List[Optional[bool]], assignment: List[int]) -> bool:
+        """
+        Есть ли среди rows строка, совместимая со строкой фрагмента
+        по уже назначенным столбцам (линейный просмотр).
+        """
+        shifts = [table.shifts[var] for var in assignment]
+        for real_row in rows:
+            self.stats.rows_scanned += 1
+            partial_row = tuple((real_row >> shift) & 1 for shift in shifts)
+            if self._rows_match(fragment_row, partial_row):
+                return True
+        return False
+
+    def _narrow(self, table: TruthTable, candidates: List[Any],
+                assignment: List[int]) -> Optional[List[Any]]:
+        """
+        Пересчитывает множества строк-кандидатов после назначения последнего столбца.
+        candidates[i] - битовое множество строк таблицы, совместимых с i-й строкой
+        фрагмента по уже назначенным столбцам. Возвращает None, если какое-то опустело
+        (номер этой строки остается в self._dead_row).
+        """
+        column = len(assignment) - 1
+        var = assignment[-1]
+        narrowed = list(candidates)
 
-        col_indices = range(self.n_vars)
+        # Строки, где в новом столбце пусто, уже проверены на предыдущем уровне.
+        for i, frag_row in enumerate(self.fragment):
+            value = frag_row[column]
+            if value is None:
+                continue
+            self.stats.row_checks += 1
+            narrowed[i] = narrowed[i] & table.literal(var, value)
+            if self.use_index:
+                if table.is_empty(narrowed[i]):
+                    self._dead_row = i
+                    return None
+            elif not self._row_has_match(table, self._scan_rows[bool(self.results[i])],
+                                         frag_row, assignment):
+                self._dead_row = i
+                return None
+        return narrowed
 
-        for perm in itertools.permutations(col_indices):
+    def _row_signature(self, row_index: int, depth: int) -> Tuple[Tuple[Optional[bool], ...], bool]:
+        return tuple(self.fragment[row_index][:depth]), bool(self.results[row_index])
 
-            is_permutation_valid = True
+    def _is_known_dead(self, prefix: Tuple[int, ...]) -> bool:
+        signature = self.cache.nogoods.get(prefix)
+        return signature is not None and signature in self._row_signatures[len(prefix)]
 
-            for i, frag_row_vals in enumerate(self.fragment):
-                frag_result = self.results[i]
+    def _rows_distinctly_matched(self, table: TruthTable, candidates: List[Any]) -> bool:
+        """
+        Можно ли сопоставить строкам фрагмента попарно различные строки таблицы.
+        Каждой строке фрагмента достаточно оставить не более len(candidates) кандидатов:
+        если их больше, для нее всегда найдется свободная строка.
+        """
+        limit = len(candidates)
+        adjacency = [table.lowest_rows(mask, limit) for mask in candidates]
+        return len(hopcroft_karp(adjacency)) == limit
+
+    def _assign_columns(self, table: TruthTable, candidates: List[Any],
+                        assignment: List[int], used: List[bool]) -> Iterator[List[int]]:
+        """
+        Назначает столбцы фрагмента переменным по одному (в лексикографическом порядке,
+        как itertools.permutations) и отбрасывает частичное назначение, как только
+        у какой-либо строки фрагмента не остается совместимой строки таблицы.
+        Полные назначения выдаются по мере нахождения.
+        """
+        if len(assignment) == self.n_vars:
+            if not self.distinct_rows or self._rows_distinctly_matched(table, candidates):
+                yield list(assignment)
+            return
 
-                found_match_in_full_table = False
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SearchCancelled()
 
-                for real_row_vals, real_res in full_table:
-                    if real_res != frag_result:
-                        continue
+        for var in range(self.n_vars):
+            if used[var]:
+                continue
+            assignment.append(var)
+            used[var] = True
+            self.stats.assignments_tried += 1
 
-                    permuted_row = tuple(real_row_vals[perm[k]] for k in range(self.n_vars))
+            prefix = tuple(assignment)
+            if self.cache is not None and self._is_known_dead(prefix):
+                self.stats.nogood_hits += 1
+                narrowed = None
+            else:
+                narrowed = self._narrow(table, candidates, assignment)
+                if narrowed is None and self.cache is not None:
+                    self.cache.add_nogood(prefix, self._row_signature(self._dead_row, len(prefix)))
 
-                    if self._rows_match(frag_row_vals, permuted_row):
-                        found_match_in_full_table = True
-                        break
+            if narrowed is not None:
+                yield from self._assign_columns(table, narrowed, assignment, used)
 
-                if not found_match_in_full_table:
-                    is_permutation_valid = False
-                    break
+            assignment.pop()
+            used[var] = False
 
-            if is_permutation_valid:
-                return ''.join([self.variables[idx] for idx in perm])
+    def _sat_search(self) -> Optional["FragmentEncoder"]:
+        from sat_backend import FragmentEncoder
+        try:
+            return FragmentEncoder(self.fragment, self.results, self.expression,
+                                   self.variables, self.distinct_rows)
+        except UnsupportedExpression:
+            return None
+
+    def _iter_sat_solutions(self, sat_search: "FragmentEncoder") -> Iterator[str]:
+        sat = sat_search.sat
+        for perm in sat_search.iter_assignments():
+            self.stats.assignments_tried = sat.decisions
+            self.stats.sat_conflicts = sat.conflicts
+            yield ''.join([self.variables[idx] for idx in perm])
+        self.stats.assignments_tried = sat.decisions
+        self.stats.sat_conflicts = sat.conflicts
 
-        return "Solution not found"
\ No newline at end of file
+    def iter_solutions(self) -> Iterator[str]:
+        """
+        Лениво перебирает все подходящие порядки переменных (в лексикографическом
+        порядке номеров переменных). Поиск продолжается с того места, где остановился
+        предыдущий ответ, так что первые k ответов стоят ровно одного прохода.
+        """
+        self.stats = SearchStats()
+        started = time.perf_counter()
+        try:
+            if self.backend == "sat":
+                sat_search = self._sat_search()
+                if sat_search is not None:
+                    yield from self._iter_sat_solutions(sat_search)
+                    return
+
+            full_table = self._generate_full_table()
+            candidates = [full_table.result_mask(bool(res)) for res in self.results]
+            if self.cache is not None:
+                self._row_signatures = [{self._row_signature(i, depth) for i in range(len(self.fragment))}
+                                        for depth in range(self.n_vars + 1)]
+            if not self.use_index:
+                self._scan_rows = {True: list(full_table.rows(True)),
+                                   False: list(full_table.rows(False))}
+
+            if any(full_table.is_empty(mask) for mask in candidates):
+                return
+
+            for perm in self._assign_columns(full_table, candidates, [], [False] * self.n_vars):
+                yield ''.join([self.variables[idx] for idx in perm])
+        finally:
+            self.stats.elapsed = time.perf_counter() - started
+
+    def count_solutions(self, limit: Optional[int] = None) -> int:
+        """
+        Число подходящих порядков переменных, но не больше limit:
+        count_solutions(limit=2) == 1 означает, что ответ единственный.
+        """
+        return sum(1 for _ in itertools.islice(self.iter_solutions(), limit))
+
+    def solve(self) -> str:
+        solutions = self.iter_solutions()
+        try:
+            return next(solutions, "Solution not found")
+        finally:
+            solutions.close()
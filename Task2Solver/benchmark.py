@@ -0,0 +1,142 @@
+"""
+Замер LogicSolver на случайных выражениях и фрагментах.
+
+Пример:
+    PYTHONPATH=.. python benchmark.py --vars 3-12 --rows 1,4,8,16 --backends bitmask,sat --output bench.jsonl
+
+Каждая строка вывода - JSON-объект (или строка CSV с --format csv) с меткой --label,
+параметрами случая и счетчиками SearchStats, так что результаты разных версий можно сравнивать.
+"""
+import argparse
+import csv
+import json
+import platform
+import random
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from auto_solver import LogicSolver
+from common.safe_eval import compile_expression
+
+BINARY_OPS = ['<=', '==', ' and ', ' or ']
+FIELDS = ['label', 'n_vars', 'rows', 'seed', 'backend', 'use_index', 'mode', 'found',
+          'time', 'assignments_tried', 'row_checks', 'rows_scanned', 'sat_conflicts', 'expression']
+
+
+def random_expression(rng: random.Random, variables: List[str]) -> str:
+    """Случайное выражение в той форме, которую дает LogicApp.replacements; каждая переменная входит хотя бы раз."""
+    terms = [f"(not {v})" if rng.random() < 0.3 else v for v in variables]
+    rng.shuffle(terms)
+    while len(terms) > 1:
+        i = rng.randrange(len(terms) - 1)
+        op = rng.choice(BINARY_OPS)
+        merged = f"({terms[i]}{op}{terms[i + 1]})"
+        if rng.random() < 0.15:
+            merged = f"(not {merged})"
+        terms[i:i + 2] = [merged]
+    return terms[0]
+
+
+def random_fragment(rng: random.Random, expression: str, variables: List[str], rows: int,
+                    blank: float) -> Tuple[List[List[Optional[bool]]], List[bool]]:
+    """Фрагмент из случайных строк полной таблицы в случайном порядке столбцов, часть ячеек пустая."""
+    n = len(variables)
+    perm = list(range(n))
+    rng.shuffle(perm)
+    evaluate = compile_expression(expression).function(tuple(variables))
+    fragment, results = [], []
+    for _ in range(rows):
+        values = [rng.randint(0, 1) for _ in range(n)]
+        results.append(bool(evaluate(*values)))
+        fragment.append([None if rng.random() < blank else bool(values[perm[k]]) for k in range(n)])
+    return fragment, results
+
+
+def run_case(n_vars: int, rows: int, seed: int, backend: str, use_index: bool,
+             blank: float, uniqueness: bool) -> Dict[str, object]:
+    rng = random.Random(f"{seed}:{n_vars}:{rows}")
+    variables = [f"v{i}" for i in range(n_vars)]
+    expression = random_expression(rng, variables)
+    fragment, results = random_fragment(rng, expression, variables, rows, blank)
+
+    solver = LogicSolver(fragment, results, expression, variables,
+                         use_index=use_index, backend=backend)
+    if uniqueness:
+        found = solver.count_solutions(limit=2)
+    else:
+        found = int(solver.solve() != "Solution not found")
+
+    stats = solver.stats
+    return {
+        'n_vars': n_vars, 'rows': rows, 'seed': seed, 'backend': backend, 'use_index': use_index,
+        'mode': 'unique' if uniqueness else 'first', 'found': found,
+        'time': round(stats.elapsed, 6), 'assignments_tried': stats.assignments_tried,
+        'row_checks': stats.row_checks, 'rows_scanned': stats.rows_scanned,
+        'sat_conflicts': stats.sat_conflicts, 'expression': expression,
+    }
+
+
+def iter_cases(args: argparse.Namespace) -> Iterator[Dict[str, object]]:
+    for n_vars in args.vars:
+        for rows in args.rows:
+            for backend in args.backends:
+                for use_index in ([True, False] if args.compare_scan else [True]):
+                    for repeat in range(args.repeat):
+                        record = run_case(n_vars, rows, args.seed + repeat, backend, use_index,
+                                          args.blank, args.uniqueness)
+                        yield {'label': args.label, **record}
+
+
+def _parse_range(text: str) -> List[int]:
+    values: List[int] = []
+    for part in text.split(','):
+        if '-' in part:
+            lo, hi = part.split('-')
+            values.extend(range(int(lo), int(hi) + 1))
+        else:
+            values.append(int(part))
+    return values
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк LogicSolver (задание 2)")
+    parser.add_argument('--vars', type=_parse_range, default=_parse_range('3-16'),
+                        help="число переменных: '3-16' или '4,8,12'")
+    parser.add_argument('--rows', type=_parse_range, default=_parse_range('1,2,4,8,16'),
+                        help="число строк фрагмента: '1-16' или '1,4,16'")
+    parser.add_argument('--backends', default='bitmask', type=lambda s: s.split(','),
+                        help="bitmask,numpy,sat")
+    parser.add_argument('--compare-scan', action='store_true',
+                        help="дополнительно прогнать use_index=False (линейный просмотр таблицы)")
+    parser.add_argument('--uniqueness', action='store_true',
+                        help="мерить count_solutions(limit=2) вместо solve()")
+    parser.add_argument('--blank', type=float, default=0.4, help="доля пустых ячеек фрагмента")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--label', default='', help="метка версии для сравнения прогонов")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('--output', help="файл для результатов (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        if args.format == 'csv':
+            writer = csv.DictWriter(out, fieldnames=FIELDS)
+            writer.writeheader()
+            for record in iter_cases(args):
+                writer.writerow(record)
+                out.flush()
+        else:
+            header = {'label': args.label, 'python': platform.python_version(),
+                      'argv': sys.argv[1:] if argv is None else argv}
+            out.write(json.dumps({'meta': header}, ensure_ascii=False) + '\n')
+            for record in iter_cases(args):
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from collections import deque
+from typing import Dict, Hashable, Sequence
+
+
+def hopcroft_karp(adjacency: Sequence[Sequence[Hashable]]) -> Dict[int, Hashable]:
+    """
+    Наибольшее паросочетание в двудольном графе (алгоритм Хопкрофта-Карпа).
+
+    :param adjacency: adjacency[u] - вершины правой доли, смежные с u-й вершиной левой доли.
+    :return: Словарь {вершина левой доли: вершина правой доли}.
+    """
+    n = len(adjacency)
+    match_left: Dict[int, Hashable] = {}
+    match_right: Dict[Hashable, int] = {}
+    dead_end = float('inf')
+
+    while True:
+        dist: Dict[int, float] = {}
+        queue = deque()
+        for u in range(n):
+            if u not in match_left:
+                dist[u] = 0
+                queue.append(u)
+
+        augmenting_path_exists = False
+        while queue:
+            u = queue.popleft()
+            for v in adjacency[u]:
+                w = match_right.get(v)
+                if w is None:
+                    augmenting_path_exists = True
+                elif w not in dist:
+                    dist[w] = dist[u] + 1
+                    queue.append(w)
+
+        if not augmenting_path_exists:
+            return match_left
+
+        def augment(u: int) -> bool:
+            for v in adjacency[u]:
+                w = match_right.get(v)
+                if w is None or (dist.get(w) == dist[u] + 1 and augment(w)):
+                    match_left[u] = v
+                    match_right[v] = u
+                    return True
+            dist[u] = dead_end
+            return False
+
+        for u in range(n):
+            if u not in match_left:
+                augment(u)
@@ -0,0 +1,100 @@
+import ast
+from typing import Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+from truth_table import MaskEvaluator, UnsupportedExpression
+
+
+def input_matrix(n_vars: int) -> np.ndarray:
+    """
+    Матрица входов 2^n x n в упакованном виде: строка i массива формы (n, ceil(2^n / 8))
+    хранит столбец i-й переменной, бит k байта j соответствует строке таблицы 8*j + k
+    (порядок строк совпадает с itertools.product([0, 1], repeat=n)).
+    """
+    size = 1 << n_vars
+    n_bytes = (size + 7) // 8
+    matrix = np.empty((n_vars, n_bytes), dtype=np.uint8)
+    for i in range(n_vars):
+        half = 1 << (n_vars - 1 - i)
+        if half >= 8:
+            block = np.repeat(np.array([0x00, 0xFF], dtype=np.uint8), half // 8)
+            matrix[i] = np.tile(block, n_bytes // block.size)
+        else:
+            byte = sum(1 << k for k in range(8) if (k // half) % 2)
+            matrix[i] = byte
+    return matrix & _valid_mask(n_vars)
+
+
+def _valid_mask(n_vars: int) -> np.ndarray:
+    size = 1 << n_vars
+    if size >= 8:
+        return np.full(size // 8, 0xFF, dtype=np.uint8)
+    return np.array([(1 << size) - 1], dtype=np.uint8)
+
+
+class NumpyTruthTable:
+    """
+    Таблица истинности на NumPy: столбцы переменных и F хранятся упакованными
+    битовыми массивами uint8, выражение вычисляется поэлементно обходом AST,
+    а сравнение строки фрагмента со всеми строками таблицы - это AND нескольких массивов.
+    Интерфейс совпадает с BitmaskTruthTable, поэтому LogicSolver работает с любой из них.
+    """
+
+    def __init__(self, variables: Sequence[str], result: np.ndarray) -> None:
+        self.variables = list(variables)
+        self.n_vars = len(self.variables)
+        self.size = 1 << self.n_vars
+        self.full = _valid_mask(self.n_vars)
+        self.columns = list(input_matrix(self.n_vars))
+        self.negated_columns = [self.full & ~col for col in self.columns]
+        self.shifts = [self.n_vars - 1 - i for i in range(self.n_vars)]
+        self.result = result & self.full
+
+    @classmethod
+    def from_expression(cls, expression: str, variables: Sequence[str]) -> "NumpyTruthTable":
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise UnsupportedExpression(str(e)) from e
+        table = cls(variables, np.zeros_like(_valid_mask(len(variables))))
+        names = dict(zip(table.variables, table.columns))
+        empty = np.zeros_like(table.full)
+        table.result = MaskEvaluator(names, table.full, empty).visit(tree.body) & table.full
+        return table
+
+    @classmethod
+    def from_rows(cls, variables: Sequence[str], results: Iterable[bool]) -> "NumpyTruthTable":
+        """Собирает таблицу из уже вычисленных значений F (по одному на строку)."""
+        values = np.fromiter(results, dtype=bool, count=1 << len(variables))
+        return cls(variables, np.packbits(values, bitorder='little'))
+
+    def result_mask(self, result: bool) -> np.ndarray:
+        """Битовое множество строк, в которых F равно result."""
+        return self.result if result else self.full & ~self.result
+
+    def literal(self, var_index: int, value: bool) -> np.ndarray:
+        """Битовое множество строк, в которых переменная var_index равна value."""
+        return self.columns[var_index] if value else self.negated_columns[var_index]
+
+    @staticmethod
+    def is_empty(mask: np.ndarray) -> bool:
+        return not mask.any()
+
+    @staticmethod
+    def lowest_rows(mask: np.ndarray, limit: int) -> List[int]:
+        """Первые limit номеров строк из битового множества mask."""
+        rows: List[int] = []
+        for byte_index in np.flatnonzero(mask):
+            byte = int(mask[byte_index])
+            for k in range(8):
+                if byte >> k & 1:
+                    rows.append(int(byte_index) * 8 + k)
+                    if len(rows) == limit:
+                        return rows
+        return rows
+
+    def rows(self, result: bool) -> Iterator[int]:
+        """Номера строк, в которых F равно result, в порядке возрастания."""
+        bits = np.unpackbits(self.result_mask(result), count=self.size, bitorder='little')
+        return iter(np.flatnonzero(bits).tolist())
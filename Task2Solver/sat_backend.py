@@ -0,0 +1,124 @@
+import ast
+from typing import Iterator, List, Optional, Sequence
+
+from sat_solver import SatSolver
+from truth_table import MaskEvaluator, UnsupportedExpression
+
+
+class _Lit:
+    """
+    Литерал формулы, строящейся по преобразованию Цейтина. Операторы & | ^ ~
+    заводят вспомогательные переменные, поэтому MaskEvaluator без изменений
+    превращает AST выражения в клаузы.
+    """
+
+    def __init__(self, encoder: "FragmentEncoder", lit: int) -> None:
+        self.encoder = encoder
+        self.lit = lit
+
+    def __invert__(self) -> "_Lit":
+        return _Lit(self.encoder, -self.lit)
+
+    def __and__(self, other: "_Lit") -> "_Lit":
+        return self.encoder.gate_and(self, other)
+
+    def __or__(self, other: "_Lit") -> "_Lit":
+        return ~self.encoder.gate_and(~self, ~other)
+
+    def __xor__(self, other: "_Lit") -> "_Lit":
+        return self.encoder.gate_xor(self, other)
+
+
+class FragmentEncoder:
+    """
+    Кодирует задачу «какой столбец фрагмента какой переменной соответствует» в КНФ:
+    x[k][v] - столбец k есть переменная v (перестановка), b[r][v] - значение
+    переменной v в строке полной таблицы, которой соответствует строка фрагмента r,
+    и F(b[r]) равно результату r-й строки.
+    """
+
+    def __init__(self, fragment: List[List[Optional[bool]]], results: List[bool],
+                 expression: str, variables: Sequence[str], distinct_rows: bool = False) -> None:
+        self.n_vars = len(variables)
+        self.sat = SatSolver()
+        self.true = _Lit(self, self.sat.new_var())
+        self.sat.add_clause([self.true.lit])
+        self.false = ~self.true
+
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise UnsupportedExpression(str(e)) from e
+
+        n = self.n_vars
+        self.x = [[self.sat.new_var() for _ in range(n)] for _ in range(n)]
+        self.sat.decision_order = [var for row in self.x for var in row]
+        for k in range(n):
+            self._exactly_one([self.x[k][v] for v in range(n)])
+            self._exactly_one([self.x[j][k] for j in range(n)])
+
+        row_vars = []
+        for r, frag_row in enumerate(fragment):
+            b = [_Lit(self, self.sat.new_var()) for _ in range(n)]
+            row_vars.append(b)
+            names = dict(zip(variables, b))
+            f = MaskEvaluator(names, self.true, self.false).visit(tree.body)
+            self.sat.add_clause([f.lit if results[r] else -f.lit])
+
+            for k, value in enumerate(frag_row):
+                if value is None:
+                    continue
+                for v in range(n):
+                    self.sat.add_clause([-self.x[k][v], b[v].lit if value else -b[v].lit])
+
+        if distinct_rows:
+            for r in range(len(row_vars)):
+                for q in range(r):
+                    self.sat.add_clause([(row_vars[r][v] ^ row_vars[q][v]).lit for v in range(n)])
+
+    def _exactly_one(self, lits: List[int]) -> None:
+        self.sat.add_clause(lits)
+        for i in range(len(lits)):
+            for j in range(i):
+                self.sat.add_clause([-lits[i], -lits[j]])
+
+    def gate_and(self, a: _Lit, b: _Lit) -> _Lit:
+        if a.lit == self.false.lit or b.lit == self.false.lit or a.lit == -b.lit:
+            return self.false
+        if a.lit == self.true.lit or a.lit == b.lit:
+            return b
+        if b.lit == self.true.lit:
+            return a
+        t = self.sat.new_var()
+        self.sat.add_clause([-t, a.lit])
+        self.sat.add_clause([-t, b.lit])
+        self.sat.add_clause([t, -a.lit, -b.lit])
+        return _Lit(self, t)
+
+    def gate_xor(self, a: _Lit, b: _Lit) -> _Lit:
+        if a.lit in (self.true.lit, self.false.lit):
+            return ~b if a.lit == self.true.lit else b
+        if b.lit in (self.true.lit, self.false.lit):
+            return ~a if b.lit == self.true.lit else a
+        t = self.sat.new_var()
+        self.sat.add_clause([-t, a.lit, b.lit])
+        self.sat.add_clause([-t, -a.lit, -b.lit])
+        self.sat.add_clause([t, -a.lit, b.lit])
+        self.sat.add_clause([t, a.lit, -b.lit])
+        return _Lit(self, t)
+
+    def iter_assignments(self) -> Iterator[List[int]]:
+        """
+        Перебирает перестановки (perm[k] - номер переменной k-го столбца).
+        После каждого ответа добавляется запрещающая его клауза, обученные клаузы
+        переиспользуются. Столбцы перебираются в порядке x[0][0], x[0][1], ...
+        со значением True в первую очередь, поэтому ответы идут в лексикографическом порядке.
+        """
+        n = self.n_vars
+        while True:
+            model = self.sat.solve()
+            if model is None:
+                return
+            perm = [next(v for v in range(n) if model[self.x[k][v]]) for k in range(n)]
+            yield perm
+            self.sat.add_clause([-self.x[k][perm[k]] for k in range(n)])
@@ -0,0 +1,222 @@
+from typing import Dict, List, Optional, Sequence
+
+
+class SatSolver:
+    """
+    Небольшой CDCL-решатель (2 наблюдаемых литерала, обучение по первой точке
+    доминирования, нехронологический откат). Литералы - ненулевые целые числа
+    в стиле DIMACS: v - переменная истинна, -v - ложна.
+
+    Переменные, перечисленные в decision_order, выбираются первыми и в заданном
+    порядке (сначала со значением True), остальные - по активности.
+    После solve() можно добавлять клаузы и решать снова: обученные клаузы сохраняются.
+    """
+
+    def __init__(self) -> None:
+        self.n_vars = 0
+        self.clauses: List[List[int]] = []
+        self.watches: Dict[int, List[int]] = {}
+        self.value: List[Optional[bool]] = [None]
+        self.level: List[int] = [0]
+        self.reason: List[Optional[int]] = [None]
+        self.activity: List[float] = [0.0]
+        self.phase: List[bool] = [False]
+        self.trail: List[int] = []
+        self.trail_lim: List[int] = []
+        self.qhead = 0
+        self.unsat = False
+        self.decision_order: List[int] = []
+        self.bump = 1.0
+        self.decisions = 0
+        self.conflicts = 0
+
+    def new_var(self) -> int:
+        self.n_vars += 1
+        self.value.append(None)
+        self.level.append(0)
+        self.reason.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        self.watches[self.n_vars] = []
+        self.watches[-self.n_vars] = []
+        return self.n_vars
+
+    def _lit_value(self, lit: int) -> Optional[bool]:
+        val = self.value[abs(lit)]
+        if val is None:
+            return None
+        return val if lit > 0 else not val
+
+    def _assign(self, lit: int, reason: Optional[int]) -> None:
+        var = abs(lit)
+        self.value[var] = lit > 0
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def add_clause(self, lits: Sequence[int]) -> None:
+        if self.unsat:
+            return
+        self._backtrack(0)
+
+        clause: List[int] = []
+        for lit in lits:
+            if -lit in clause:
+                return
+            val = self._lit_value(lit)
+            if val is True:
+                return
+            if val is None and lit not in clause:
+                clause.append(lit)
+
+        if not clause:
+            self.unsat = True
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            if self._propagate() is not None:
+                self.unsat = True
+        else:
+            self._attach(clause)
+
+    def _attach(self, clause: List[int]) -> int:
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def _propagate(self) -> Optional[int]:
+        """Распространение единичных клауз. Возвращает номер конфликтной клаузы или None."""
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+            watching = self.watches[false_lit]
+            kept: List[int] = []
+            conflict = None
+
+            for pos, index in enumerate(watching):
+                clause = self.clauses[index]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+
+                if self._lit_value(clause[0]) is True:
+                    kept.append(index)
+                    continue
+
+                for k in range(2, len(clause)):
+                    if self._lit_value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self._lit_value(clause[0]) is False:
+                        conflict = index
+                        kept.extend(watching[pos + 1:])
+                        break
+                    self._assign(clause[0], index)
+
+            self.watches[false_lit] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+    def _analyze(self, conflict: int) -> List[int]:
+        """Обучаемая клауза по первой точке доминирования; ее первый литерал - утверждаемый."""
+        current_level = len(self.trail_lim)
+        seen = set()
+        learned: List[int] = [0]
+        counter = 0
+        lit = 0
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+
+        while True:
+            for q in clause:
+                if q == lit:
+                    continue
+                var = abs(q)
+                if var in seen or self.level[var] == 0:
+                    continue
+                seen.add(var)
+                self.activity[var] += self.bump
+                if self.level[var] == current_level:
+                    counter += 1
+                else:
+                    learned.append(q)
+
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.clauses[self.reason[abs(lit)]]
+
+        learned[0] = -lit
+        self.bump *= 1.05
+        return learned
+
+    def _backtrack(self, target_level: int) -> None:
+        if len(self.trail_lim) <= target_level:
+            return
+        start = self.trail_lim[target_level]
+        for lit in self.trail[start:]:
+            var = abs(lit)
+            self.phase[var] = lit > 0
+            self.value[var] = None
+            self.reason[var] = None
+        del self.trail[start:]
+        del self.trail_lim[target_level:]
+        self.qhead = len(self.trail)
+
+    def _pick_branch_literal(self) -> Optional[int]:
+        for var in self.decision_order:
+            if self.value[var] is None:
+                return var
+        best = None
+        for var in range(1, self.n_vars + 1):
+            if self.value[var] is None and (best is None or self.activity[var] > self.activity[best]):
+                best = var
+        if best is None:
+            return None
+        return best if self.phase[best] else -best
+
+    def solve(self) -> Optional[List[bool]]:
+        """
+        Ищет выполняющий набор. Возвращает список значений переменных
+        (индекс 0 не используется) или None, если формула невыполнима.
+        """
+        if self.unsat:
+            return None
+        self._backtrack(0)
+        if self._propagate() is not None:
+            self.unsat = True
+            return None
+
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.trail_lim:
+                    self.unsat = True
+                    return None
+                learned = self._analyze(conflict)
+                if len(learned) == 1:
+                    self._backtrack(0)
+                    self._assign(learned[0], None)
+                    continue
+                # Второй наблюдаемый литерал - с наибольшим уровнем после утверждаемого.
+                top = max(range(1, len(learned)), key=lambda k: self.level[abs(learned[k])])
+                learned[1], learned[top] = learned[top], learned[1]
+                self._backtrack(self.level[abs(learned[1])])
+                self._assign(learned[0], self._attach(learned))
+                continue
+
+            lit = self._pick_branch_literal()
+            if lit is None:
+                return [bool(v) for v in self.value]
+            self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self._assign(lit, None)
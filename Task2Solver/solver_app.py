@@ -1,9 +1,11 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
-from typing import List
+from typing import List, Optional
 
 from custom_ttk import ColoredCombobox
-from auto_solver import LogicSolver
+from auto_solver import LogicSolver, SearchCache, SearchCancelled
 
 
 class LogicApp:
@@ -22,7 +24,19 @@ class LogicApp:
 
         self.table_rows_widgets: List[List[ColoredCombobox]] = []
 
+        # Решение идет в фоновом потоке: главный цикл Tk только ставит задачи
+        # и забирает результаты. Таблица истинности и тупиковые префиксы
+        # переиспользуются между правками фрагмента.
+        self.search_cache = SearchCache()
+        self._jobs: queue.Queue = queue.Queue()
+        self._results: queue.Queue = queue.Queue()
+        self._generation = 0
+        self._cancel_event: Optional[threading.Event] = None
+        self._live_solve_id: Optional[str] = None
+        threading.Thread(target=self._worker_loop, daemon=True).start()
+
         self._init_ui()
+        self.root.after(50, self._poll_results)
 
     def _init_ui(self):
         top_frame = ttk.Frame(self.root, padding=10)
@@ -69,6 +83,11 @@ class LogicApp:
         ttk.Button(mid_frame, text="Создать таблицу",
                    command=self.create_table).pack(side=tk.LEFT, padx=15)
 
+        self.distinct_rows_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(mid_frame, text="Строки фрагмента - разные строки таблицы",
+                        variable=self.distinct_rows_var,
+                        command=self._schedule_live_solve).pack(side=tk.LEFT, padx=5)
+
         self.bottom_frame = ttk.Frame(self.root, padding=10)
         self.bottom_frame.pack(fill=tk.BOTH, expand=True)
 
@@ -137,6 +156,7 @@ class LogicApp:
                                      values=['0', '1', ' '],
                                      colors=['red', 'green', 'gray'], width=5)
                 cb.set(' ')
+                cb.selected_var.trace_add('write', self._schedule_live_solve)
                 cb.pack(side=tk.LEFT, padx=2)
                 row_widgets.append(cb)
 
@@ -146,6 +166,7 @@ class LogicApp:
                                      values=['0', '1'],
                                      colors=['red', 'green'], width=5)
             cb_res.set('1')
+            cb_res.selected_var.trace_add('write', self._schedule_live_solve)
             cb_res.pack(side=tk.LEFT)
             row_widgets.append(cb_res)
 
@@ -176,33 +197,94 @@ class LogicApp:
 
         return fragment, results
 
-    def solve(self):
+    def _collect_request(self, show_errors: bool):
         vars_str = self.entry_vars.get().replace(" ", "")
         raw_expr = self.entry_expr.get().strip()
         variable_names = list(vars_str)
 
         if not raw_expr or not variable_names:
-            messagebox.showerror("Ошибка", "Заполните выражение и переменные")
-            return
+            if show_errors:
+                messagebox.showerror("Ошибка", "Заполните выражение и переменные")
+            return None
 
         py_expr = raw_expr
         for sym, replacement in self.replacements.items():
             py_expr = py_expr.replace(sym, replacement)
 
         fragment, results = self._get_data()
+        if any(len(row) != len(variable_names) for row in fragment):
+            if show_errors:
+                messagebox.showerror("Ошибка", "Число столбцов таблицы не совпадает с числом переменных. "
+                                               "Нажмите «Создать таблицу»")
+            return None
 
-        try:
-            solver = LogicSolver(fragment, results, py_expr, variable_names)
-            answer = solver.solve()
-
-            if answer == "Solution not found":
-                self.lbl_result.config(text="Решение не найдено", foreground="red")
-            else:
-                self.lbl_result.config(text=f"Ответ: {answer}", foreground="green")
+        return fragment, results, py_expr, variable_names, self.distinct_rows_var.get()
 
-        except Exception as e:
+    def solve(self):
+        request = self._collect_request(show_errors=True)
+        if request is not None:
+            self._submit(request)
+
+    def _schedule_live_solve(self, *_):
+        if self._live_solve_id is not None:
+            self.root.after_cancel(self._live_solve_id)
+        self._live_solve_id = self.root.after(150, self._live_solve)
+
+    def _live_solve(self):
+        self._live_solve_id = None
+        request = self._collect_request(show_errors=False)
+        if request is not None:
+            self._submit(request)
+
+    def _submit(self, request):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        self._generation += 1
+        self._cancel_event = threading.Event()
+        self._jobs.put((self._generation, self._cancel_event, request))
+        self.lbl_result.config(text="Решаю...", foreground="gray")
+
+    def _worker_loop(self):
+        while True:
+            job = self._jobs.get()
+            while not self._jobs.empty():
+                job = self._jobs.get_nowait()
+
+            generation, cancel_event, request = job
+            if cancel_event.is_set():
+                continue
+
+            fragment, results, py_expr, variable_names, distinct_rows = request
+            try:
+                solver = LogicSolver(fragment, results, py_expr, variable_names,
+                                     distinct_rows=distinct_rows,
+                                     cache=self.search_cache,
+                                     cancel_event=cancel_event)
+                outcome = solver.solve()
+            except SearchCancelled:
+                continue
+            except Exception as e:
+                outcome = e
+            self._results.put((generation, outcome))
+
+    def _poll_results(self):
+        try:
+            while True:
+                generation, outcome = self._results.get_nowait()
+                if generation == self._generation:
+                    self._show_result(outcome)
+        except queue.Empty:
+            pass
+        self.root.after(50, self._poll_results)
+
+    def _show_result(self, outcome):
+        if isinstance(outcome, Exception):
             self.lbl_result.config(text="Ошибка вычисления", foreground="red")
-            print(e)
+            print(outcome)
+        elif outcome == "Solution not found":
+            self.lbl_result.config(text="Решение не найдено", foreground="red")
+        else:
+            self.lbl_result.config(text=f"Ответ: {outcome}", foreground="green")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+import ast
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Protocol, Sequence
+
+
+class UnsupportedExpression(ValueError):
+    """Выражение содержит конструкции, которые нельзя вычислить над битовыми масками."""
+
+
+@lru_cache(maxsize=64)
+def variable_masks(n_vars: int) -> List[int]:
+    """
+    Маски переменных для таблицы из 2^n строк.
+    Бит r маски i равен значению i-й переменной в строке r
+    (порядок строк совпадает с itertools.product([0, 1], repeat=n)).
+    """
+    size = 1 << n_vars
+    masks = []
+    for i in range(n_vars):
+        half = 1 << (n_vars - 1 - i)
+        mask = ((1 << half) - 1) << half
+        length = half << 1
+        while length < size:
+            mask |= mask << length
+            length <<= 1
+        masks.append(mask)
+    return masks
+
+
+class TruthTable(Protocol):
+    """
+    Общий интерфейс таблиц истинности для LogicSolver.
+    Маска - битовое множество строк таблицы (тип зависит от реализации).
+    """
+    n_vars: int
+    size: int
+    shifts: List[int]
+
+    def result_mask(self, result: bool) -> Any: ...
+
+    def literal(self, var_index: int, value: bool) -> Any: ...
+
+    def is_empty(self, mask: Any) -> bool: ...
+
+    def lowest_rows(self, mask: Any, limit: int) -> List[int]: ...
+
+    def rows(self, result: bool) -> Iterator[int]: ...
+
+
+class BitmaskTruthTable:
+    """
+    Таблица истинности, в которой каждый столбец хранится как одно целое число
+    из 2^n бит. Весь столбец F вычисляется за один проход по AST выражения
+    побитовыми операциями над этими числами.
+    """
+
+    def __init__(self, variables: Sequence[str], result: int) -> None:
+        self.variables = list(variables)
+        self.n_vars = len(self.variables)
+        self.size = 1 << self.n_vars
+        self.full = (1 << self.size) - 1
+        self.columns = variable_masks(self.n_vars)
+        self.negated_columns = [self.full & ~col for col in self.columns]
+        self.shifts = [self.n_vars - 1 - i for i in range(self.n_vars)]
+        self.result = result & self.full
+
+    @classmethod
+    def from_expression(cls, expression: str, variables: Sequence[str]) -> "BitmaskTruthTable":
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise UnsupportedExpression(str(e)) from e
+        table = cls(variables, 0)
+        names = dict(zip(table.variables, table.columns))
+        table.result = MaskEvaluator(names, table.full, 0).visit(tree.body) & table.full
+        return table
+
+    @classmethod
+    def from_rows(cls, variables: Sequence[str], results: Iterable[bool]) -> "BitmaskTruthTable":
+        """Собирает таблицу из уже вычисленных значений F (по одному на строку)."""
+        mask = 0
+        for r, res in enumerate(results):
+            if res:
+                mask |= 1 << r
+        return cls(variables, mask)
+
+    def result_mask(self, result: bool) -> int:
+        """Битовое множество строк, в которых F равно result."""
+        return self.result if result else self.full & ~self.result
+
+    def literal(self, var_index: int, value: bool) -> int:
+        """Битовое множество строк, в которых переменная var_index равна value."""
+        return self.columns[var_index] if value else self.negated_columns[var_index]
+
+    @staticmethod
+    def is_empty(mask: int) -> bool:
+        return not mask
+
+    @staticmethod
+    def lowest_rows(mask: int, limit: int) -> List[int]:
+        """Первые limit номеров строк из битового множества mask."""
+        rows = []
+        while mask and len(rows) < limit:
+            low = mask & -mask
+            rows.append(low.bit_length() - 1)
+            mask ^= low
+        return rows
+
+    def rows(self, result: bool) -> Iterator[int]:
+        """Номера строк, в которых F равно result, в порядке возрастания."""
+        mask = self.result_mask(result)
+        bits = bin(mask)[:1:-1]
+        row = bits.find('1')
+        while row != -1:
+            yield row
+            row = bits.find('1', row + 1)
+
+
+class MaskEvaluator:
+    """
+    Вычисляет логическое выражение сразу для всех строк таблицы.
+    Маской может быть любой тип с операторами & | ^ ~ (int, массив NumPy):
+    full - маска всех строк, empty - пустая маска того же типа.
+    """
+
+    def __init__(self, names: Dict[str, Any], full: Any, empty: Any) -> None:
+        self.names = names
+        self.full = full
+        self.empty = empty
+
+    def visit(self, node: ast.AST) -> Any:
+        method = getattr(self, f"visit_{type(node).__name__}", None)
+        if method is None:
+            raise UnsupportedExpression(f"Неподдерживаемая конструкция: {type(node).__name__}")
+        return method(node)
+
+    def visit_Name(self, node: ast.Name) -> Any:
+        if node.id not in self.names:
+            raise UnsupportedExpression(f"Неизвестная переменная: {node.id}")
+        return self.names[node.id]
+
+    def visit_Constant(self, node: ast.Constant) -> Any:
+        if node.value in (0, 1) and not isinstance(node.value, float):
+            return self.full if node.value else self.empty
+        raise UnsupportedExpression(f"Неподдерживаемая константа: {node.value!r}")
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> Any:
+        values = [self.visit(v) for v in node.values]
+        acc = values[0]
+        for v in values[1:]:
+            acc = acc & v if isinstance(node.op, ast.And) else acc | v
+        return acc
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> Any:
+        if isinstance(node.op, ast.Not):
+            return self.full & ~self.visit(node.operand)
+        raise UnsupportedExpression(f"Неподдерживаемый оператор: {type(node.op).__name__}")
+
+    def visit_BinOp(self, node: ast.BinOp) -> Any:
+        left, right = self.visit(node.left), self.visit(node.right)
+        if isinstance(node.op, ast.BitAnd):
+            return left & right
+        if isinstance(node.op, ast.BitOr):
+            return left | right
+        if isinstance(node.op, ast.BitXor):
+            return left ^ right
+        raise UnsupportedExpression(f"Неподдерживаемый оператор: {type(node.op).__name__}")
+
+    def visit_Compare(self, node: ast.Compare) -> Any:
+        acc = self.full
+        left = self.visit(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = self.visit(comparator)
+            acc = acc & self._compare(op, left, right)
+            left = right
+        return acc
+
+    def _compare(self, op: ast.cmpop, a: Any, b: Any) -> Any:
+        full = self.full
+        if isinstance(op, ast.Eq):
+            return full & ~(a ^ b)
+        if isinstance(op, ast.NotEq):
+            return a ^ b
+        if isinstance(op, ast.LtE):
+            return full & (~a | b)
+        if isinstance(op, ast.Lt):
+            return full & ~a & b
+        if isinstance(op, ast.GtE):
+            return full & (a | ~b)
+        if isinstance(op, ast.Gt):
+            return full & a & ~b
+        raise UnsupportedExpression(f"Неподдерживаемое сравнение: {type(op).__name__}")
@@ -0,0 +1,7 @@
+"""
+Общий код решателей заданий.
+
+Скрипты из папок заданий импортируют его как пакет common, поэтому запускаются
+с корнем репозитория в PYTHONPATH, например из папки задания:
+    PYTHONPATH=.. python solver_app.py
+"""
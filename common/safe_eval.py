@@ -0,0 +1,142 @@
+import ast
+from functools import lru_cache
+from typing import Any, Callable, Dict, Tuple
+
+
+class UnsafeExpression(ValueError):
+    """Выражение содержит конструкции вне разрешенного подмножества Python."""
+
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.Load,
+    ast.BoolOp, ast.And, ast.Or,
+    ast.UnaryOp, ast.Not, ast.USub, ast.UAdd, ast.Invert,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.BitAnd, ast.BitOr, ast.BitXor, ast.LShift, ast.RShift,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.IfExp, ast.Call, ast.Name, ast.Constant,
+)
+
+_SAFE_GLOBALS = {'__builtins__': {}}
+
+# Имена помощников для поэлементного вычисления: в пользовательском выражении
+# имена на "__" запрещены, поэтому совпасть с переменными они не могут.
+_ARRAY_HELPERS = ('__and', '__or', '__not', '__where')
+
+
+def normalize(expression: str) -> str:
+    return ' '.join(expression.split())
+
+
+def _validate(tree: ast.AST) -> None:
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise UnsafeExpression(f"Недопустимая конструкция: {type(node).__name__}")
+        if isinstance(node, ast.Name) and node.id.startswith('__'):
+            raise UnsafeExpression(f"Недопустимое имя: {node.id}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (bool, int, float)):
+            raise UnsafeExpression(f"Недопустимая константа: {node.value!r}")
+        if isinstance(node, ast.Call) and (not isinstance(node.func, ast.Name) or node.keywords):
+            raise UnsafeExpression("Разрешены только вызовы вида f(a, b)")
+
+
+class _ArrayRewriter(ast.NodeTransformer):
+    """
+    Переписывает and / or / not / if-else и цепочки сравнений в вызовы
+    поэлементных функций, чтобы выражение работало над массивами NumPy.
+    """
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        self.generic_visit(node)
+        helper = '__and' if isinstance(node.op, ast.And) else '__or'
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = self._call(helper, result, value)
+        return result
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return self._call('__not', node.operand)
+        return node
+
+    def visit_IfExp(self, node: ast.IfExp) -> ast.AST:
+        self.generic_visit(node)
+        return self._call('__where', node.test, node.body, node.orelse)
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        operands = [node.left] + node.comparators
+        result = None
+        for op, left, right in zip(node.ops, operands, operands[1:]):
+            pair = ast.Compare(left=left, ops=[op], comparators=[right])
+            result = pair if result is None else self._call('__and', result, pair)
+        return result
+
+    @staticmethod
+    def _call(name: str, *args: ast.AST) -> ast.Call:
+        return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=list(args), keywords=[])
+
+
+class CompiledExpression:
+    """
+    Разобранное и проверенное выражение. Код компилируется один раз,
+    функции с фиксированным порядком аргументов кэшируются.
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.tree = ast.parse(source, mode='eval')
+        _validate(self.tree)
+        self.code = compile(self.tree, '<expression>', 'eval')
+        self.names = frozenset(node.id for node in ast.walk(self.tree) if isinstance(node, ast.Name))
+        self._functions: Dict[Tuple[str, ...], Callable[..., Any]] = {}
+        self._array_code = None
+
+    def evaluate(self, context: Dict[str, Any]) -> Any:
+        return eval(self.code, _SAFE_GLOBALS, context)
+
+    def evaluate_array(self, context: Dict[str, Any]) -> Any:
+        """
+        Поэлементное вычисление над массивами NumPy (нужен NumPy): логические
+        операции и if-else заменяются на logical_and / logical_or / logical_not / where,
+        остальное работает через broadcasting самих массивов из context.
+        """
+        import numpy as np
+
+        if self._array_code is None:
+            tree = _ArrayRewriter().visit(ast.parse(self.source, mode='eval'))
+            ast.fix_missing_locations(tree)
+            self._array_code = compile(tree, '<expression>', 'eval')
+        helpers = dict(zip(_ARRAY_HELPERS, (np.logical_and, np.logical_or, np.logical_not, np.where)))
+        return eval(self._array_code, {**_SAFE_GLOBALS, **helpers}, context)
+
+    def function(self, arg_names: Tuple[str, ...]) -> Callable[..., Any]:
+        """
+        Функция lambda *arg_names: <выражение>. Вызов с позиционными аргументами
+        заметно дешевле, чем eval со словарем контекста на каждой итерации.
+        """
+        func = self._functions.get(arg_names)
+        if func is None:
+            args = ast.arguments(posonlyargs=[], args=[ast.arg(arg=name) for name in arg_names],
+                                 kwonlyargs=[], kw_defaults=[], defaults=[])
+            lambda_tree = ast.Expression(body=ast.Lambda(args=args, body=self.tree.body))
+            ast.fix_missing_locations(lambda_tree)
+            func = eval(compile(lambda_tree, '<expression>', 'eval'), dict(_SAFE_GLOBALS))
+            self._functions[arg_names] = func
+        return func
+
+
+@lru_cache(maxsize=256)
+def _compile(normalized: str) -> CompiledExpression:
+    return CompiledExpression(normalized)
+
+
+def compile_expression(expression: str) -> CompiledExpression:
+    """
+    Возвращает скомпилированное выражение из LRU-кэша (ключ - выражение
+    с нормализованными пробелами). Бросает SyntaxError или UnsafeExpression.
+    """
+    return _compile(normalize(expression))